@@ -1,35 +1,54 @@
-from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain.agents import AgentExecutor
+from langchain.agents.format_scratchpad.openai_tools import format_to_openai_tool_messages
+from langchain.agents.output_parsers.openai_tools import OpenAIToolsAgentOutputParser
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.memory import ConversationBufferMemory
 
 # Create LangChain agent
 from app.tools.file_browsing_tools import ListAllFilesTool,SearchFilesTool, GetFileMetadataTool, ListFolderFilesTool, UploadFileToDriveTool
-from app.tools.file_content_tools import ReadFileTool, ExtractInfoTool, ParseDocumentTool, AnswerQuestionTool, SearchInDocumentTool, SummarizeDocumentTool
+from app.tools.file_content_tools import ReadFileTool, ReadFilesTool, ExtractInfoTool, ParseDocumentTool, AnswerQuestionTool, SearchInDocumentTool, SummarizeDocumentTool, SearchDocumentContentsTool, AnswerCorpusQuestionTool
+from app.tools.context_budget import ContextBudget
 import os
+import asyncio
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Number of agent executors kept warm by DriveAgentPool
+AGENT_POOL_SIZE = int(os.getenv("DRIVE_AGENT_POOL_SIZE", "4"))
 
-def create_drive_agent():
-    # Define tools
-    tools = [
+
+def create_drive_tools():
+    """Create the Google Drive tool instances shared by the agents."""
+    return [
         ListAllFilesTool(),
         ListFolderFilesTool(),
         SearchFilesTool(),
         GetFileMetadataTool(),
         ReadFileTool(),
+        ReadFilesTool(),
         ParseDocumentTool(),
         ExtractInfoTool(),
         SummarizeDocumentTool(),
         SearchInDocumentTool(),
+        SearchDocumentContentsTool(),
         AnswerQuestionTool(),
+        AnswerCorpusQuestionTool(),
         UploadFileToDriveTool()
     ]
 
+
+def create_drive_agent(tools=None, llm=None):
+    # Define tools
+    if tools is None:
+        tools = create_drive_tools()
+
     # Create OpenAI-based agent
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.2, api_key=os.getenv("OPENAI_API_KEY"))
+    if llm is None:
+        llm = ChatOpenAI(model="gpt-4o", temperature=0.2, api_key=os.getenv("OPENAI_API_KEY"))
     
     # Define a system message that explains what the agent does
     system_message = """You are DriveAssistant, an AI agent specialized in managing Google Drive files.
@@ -40,11 +59,14 @@ search inside documents, and answer questions about their contents.
 Follow these steps when analyzing documents:
 1. First use the search_file tool to search for specific document(s) based on necessary filters to access its content
 2. Then use the appropriate tool based on what the user needs:
+   - Use read_files to read several documents in one call instead of calling read_file for each
    - Use parse_document to break down document structure
    - Use extract_information to identify dates, names, emails, etc.
-   - Use summarize_document to get the gist of the document
+   - Use summarize_document to get the gist of the document, or of one section with the section argument
    - Use search_in_document to find specific information
+   - Use search_document_contents to find which documents mention something across many files
    - Use answer_question to answer specific questions about the content
+   - Use answer_corpus_question to answer questions across all documents in a folder or matching a search
    - Use upload_file_to_drive to Upload a local file to Google Drive. Optionally specify a folder to upload into.
 
 Always provide helpful responses about file operations and guide users through their Google Drive interactions."""
@@ -57,11 +79,23 @@ Always provide helpful responses about file operations and guide users through t
         MessagesPlaceholder(variable_name="agent_scratchpad")
     ])
     
-    # Create memory for the agent
+    # Create memory for the agent. DriveAgentPool clears it before every request:
+    # the conversation is kept by the calling agent, which passes each query on
+    # its own, so the prompt budget below only has the current turn to fit
     memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
     
-    # Create the agent
-    agent = create_openai_tools_agent(llm, tools, prompt)
+    # Create the agent. This is create_openai_tools_agent with the prompt fitted
+    # to the context budget, since tool outputs pile up in the scratchpad
+    budget = ContextBudget()
+    agent = (
+        RunnablePassthrough.assign(
+            agent_scratchpad=lambda x: format_to_openai_tool_messages(x["intermediate_steps"])
+        )
+        | prompt
+        | RunnableLambda(lambda prompt_value: budget.fit(prompt_value.to_messages()))
+        | llm.bind(tools=[convert_to_openai_tool(tool) for tool in tools])
+        | OpenAIToolsAgentOutputParser()
+    )
     
     # Create the agent executor
     agent_executor = AgentExecutor(
@@ -74,6 +108,40 @@ Always provide helpful responses about file operations and guide users through t
     
     return agent_executor
 
+
+class DriveAgentPool:
+    """A fixed set of warm agent executors shared by concurrent requests.
+
+    The tools and the ChatOpenAI client are built once and shared; each executor
+    has its own memory, so a request checks one out for its whole run.
+    """
+
+    def __init__(self, size=AGENT_POOL_SIZE):
+        self.size = size
+        tools = create_drive_tools()
+        llm = ChatOpenAI(model="gpt-4o", temperature=0.2, api_key=os.getenv("OPENAI_API_KEY"))
+        self._executors = [create_drive_agent(tools=tools, llm=llm) for _ in range(size)]
+        self._available = None
+
+    def _queue(self):
+        # Created lazily so it binds to the running event loop
+        if self._available is None:
+            self._available = asyncio.Queue()
+            for executor in self._executors:
+                self._available.put_nowait(executor)
+        return self._available
+
+    async def ainvoke(self, query):
+        """Run a query on the next free executor, waiting if all are busy."""
+        available = self._queue()
+        executor = await available.get()
+        try:
+            # Each request starts with a clean conversation, as before
+            executor.memory.clear()
+            return await executor.ainvoke({"input": query})
+        finally:
+            available.put_nowait(executor)
+
 # if __name__ == "__main__":
 #     # Create and run the Drive agent
 #     drive_agent = create_drive_agent()
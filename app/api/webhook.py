@@ -1,20 +1,23 @@
-from fastapi import APIRouter, Request, Form
+from fastapi import APIRouter, Request, Form, BackgroundTasks
 from fastapi.responses import Response
-from app.service.agent_service import process_message
-from app.service.twilio_service import send_whatsapp_message
+from app.service.message_queue import message_queue, BUSY_MESSAGE
+from app.service.twilio_service import send_whatsapp_message_async
 import datetime
 
 router = APIRouter()
 
 @router.post("/webhook")
-async def webhook(request: Request, From: str = Form(...), Body: str = Form(...)):
+async def webhook(request: Request, background_tasks: BackgroundTasks, From: str = Form(...), Body: str = Form(...)):
     incoming_msg = Body
     sender = From
     today_date = datetime.datetime.now().strftime("%Y-%m-%d")
     thread_id = f"{sender}_{today_date}"
     
-    response_msg = await process_message(incoming_msg, thread_id)
-    
-    print(f"response: {response_msg}, threadid: {thread_id}")
-    send_whatsapp_message(sender, response_msg)
+    # Acknowledge right away; the agent runs and replies from the job queue
+    if not message_queue.submit(sender, incoming_msg, thread_id):
+        background_tasks.add_task(send_whatsapp_message_async, sender, BUSY_MESSAGE)
     return Response(status_code=200)
+
+@router.get("/webhook/metrics")
+async def webhook_metrics():
+    return message_queue.metrics()
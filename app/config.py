@@ -9,6 +9,29 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
 
+# Webhook job queue; workers may wait on a busy conversation, so there are
+# more of them than concurrent agent runs
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "100"))
+# Seconds queued messages may keep running after shutdown starts
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))
+
+# Agent scheduling: concurrent agent runs across conversations, and messages
+# that may wait for a run before senders get a busy reply. A waiting message
+# holds a webhook worker, so only WEBHOOK_WORKERS - AGENT_MAX_CONCURRENCY can
+# ever wait; by default half of those may before senders are turned away
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "4"))
+AGENT_MAX_QUEUED = int(os.getenv(
+    "AGENT_MAX_QUEUED", str(max(1, (WEBHOOK_WORKERS - AGENT_MAX_CONCURRENCY) // 2))))
+
+# Conversation checkpoints: "sqlite" keeps them on disk, "memory" in process
+CHECKPOINTER = os.getenv("CHECKPOINTER", "sqlite").lower()
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", ".cache/checkpoints.sqlite3")
+CHECKPOINT_MAX_PER_THREAD = int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "10"))
+# Seconds after its last message that a conversation is deleted (0 keeps it)
+CHECKPOINT_THREAD_TTL = float(os.getenv("CHECKPOINT_THREAD_TTL", "172800"))
+CHECKPOINT_COMPACT_INTERVAL = float(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "900"))
+
 # OpenAI
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
@@ -35,3 +58,11 @@ MCP_CONFIG = {
        "transport": "stdio"   
     }
 }
+
+# MCP server pool: copies of the servers above that tool calls are spread over.
+# All copies share the stores under .cache, which lock across processes
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "1"))
+# Seconds between pings of each server, and how long a ping or startup may take
+MCP_HEARTBEAT_INTERVAL = float(os.getenv("MCP_HEARTBEAT_INTERVAL", "30"))
+MCP_PING_TIMEOUT = float(os.getenv("MCP_PING_TIMEOUT", "10"))
+MCP_START_TIMEOUT = float(os.getenv("MCP_START_TIMEOUT", "120"))
@@ -3,12 +3,15 @@ from fastapi.responses import RedirectResponse
 from contextlib import asynccontextmanager
 from app.api.webhook import router as webhook_router
 from app.service.agent_service import init_agent, close_agent
+from app.service.message_queue import message_queue
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_agent()
     print("Agent initialized.")
+    await message_queue.start()
     yield
+    await message_queue.stop()
     await close_agent()
     print("Agent closed.")
 
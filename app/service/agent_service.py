@@ -1,26 +1,33 @@
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.prebuilt import create_react_agent
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import AIMessage
-from app.config import MCP_CONFIG
-from langgraph.checkpoint.memory import MemorySaver
+from app.config import AGENT_MAX_CONCURRENCY, AGENT_MAX_QUEUED
+from app.service.checkpointer import create_checkpointer, close_checkpointer
+from app.tools.context_budget import ContextBudget
+from app.service.mcp_pool import MCPPool
+from app.service.scheduler import ThreadScheduler, SchedulerBusy, BUSY_MESSAGE
 import uuid
 
-mcp_client = None
+mcp_pool = MCPPool()
 agent = None
+checkpointer = None
+
+scheduler = ThreadScheduler(AGENT_MAX_CONCURRENCY, AGENT_MAX_QUEUED)
 
 async def init_agent():
-    global mcp_client, agent
-    mcp_client = MultiServerMCPClient(MCP_CONFIG)
-    await mcp_client.__aenter__()
+    global agent, checkpointer
+    # Starts every MCP server up front so the first messages don't wait for them
+    await mcp_pool.start()
     
     model = ChatOpenAI(model="gpt-4o")
-    memory = MemorySaver()
-    agent = create_react_agent(model, mcp_client.get_tools(), checkpointer=memory)
+    checkpointer = await create_checkpointer()
+    # The checkpointer keeps the whole conversation; each model call gets a token-budgeted view of it
+    agent = create_react_agent(model, mcp_pool.get_tools(), prompt=ContextBudget(), checkpointer=checkpointer)
 
 async def close_agent():
-    if mcp_client:
-        await mcp_client.__aexit__(None, None, None)
+    await mcp_pool.stop()
+    if checkpointer:
+        await close_checkpointer(checkpointer)
 
 
 
@@ -35,7 +42,9 @@ async def process_message(message: str, thread_id: str = None) -> str:
     config = {"configurable": {"thread_id": thread_id}}
 
     try:
-        result = await agent.ainvoke({"messages": message}, config=config)
+        # Messages of the same thread run in order; different threads run in parallel
+        result = await scheduler.run(
+            thread_id, lambda: agent.ainvoke({"messages": message}, config=config))
         
         if isinstance(result, dict) and "messages" in result:
             for msg in reversed(result["messages"]):
@@ -44,5 +53,7 @@ async def process_message(message: str, thread_id: str = None) -> str:
                     return msg.content
             return "Couldn't generate a proper response."
         return str(result)
+    except SchedulerBusy:
+        return BUSY_MESSAGE
     except Exception as e:
         return f"Error: {str(e)}"
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import time
+
+import aiosqlite
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from app.config import (
+    CHECKPOINTER, CHECKPOINT_DB_PATH, CHECKPOINT_MAX_PER_THREAD,
+    CHECKPOINT_THREAD_TTL, CHECKPOINT_COMPACT_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedSqliteSaver(AsyncSqliteSaver):
+    """SQLite checkpointer that keeps the latest checkpoints of each thread and forgets idle threads.
+
+    Every checkpoint holds the full conversation state, so older checkpoints of a
+    thread are only needed for time travel and are dropped once a thread has more
+    than max_per_thread of them. Threads not written to for thread_ttl seconds are
+    deleted by compact(), which also returns freed pages to the filesystem.
+    """
+
+    def __init__(self, conn, *, max_per_thread=CHECKPOINT_MAX_PER_THREAD,
+                 thread_ttl=CHECKPOINT_THREAD_TTL, serde=None):
+        super().__init__(conn, serde=serde)
+        self.max_per_thread = max_per_thread
+        self.thread_ttl = thread_ttl
+        self._compactor = None
+        self.evicted_threads = 0
+        self.pruned_checkpoints = 0
+
+    async def setup(self):
+        if self.is_setup:
+            return
+        async with self.lock:
+            if not self.conn.is_alive():
+                await self.conn
+            # Only takes effect on a new database, before any table exists
+            await self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity ("
+                "thread_id TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+            )
+            await self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS thread_activity_last_used ON thread_activity (last_used)"
+            )
+            await self.conn.commit()
+        await super().setup()
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        thread_id = str(next_config["configurable"]["thread_id"])
+        checkpoint_ns = next_config["configurable"]["checkpoint_ns"]
+        async with self.lock:
+            await self.conn.execute(
+                "INSERT INTO thread_activity (thread_id, last_used) VALUES (?, ?) "
+                "ON CONFLICT (thread_id) DO UPDATE SET last_used = excluded.last_used",
+                (thread_id, time.time()),
+            )
+            await self._prune_thread(thread_id, checkpoint_ns)
+            await self.conn.commit()
+        return next_config
+
+    async def _prune_thread(self, thread_id, checkpoint_ns):
+        """Delete all but the newest max_per_thread checkpoints (and their writes) of a thread."""
+        if not self.max_per_thread:
+            return
+        # Checkpoint ids are time-ordered, so the largest ones are the newest
+        keep = (
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT ?"
+        )
+        args = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.max_per_thread)
+        cursor = await self.conn.execute(
+            f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})",
+            args,
+        )
+        self.pruned_checkpoints += max(cursor.rowcount, 0)
+        await self.conn.execute(
+            f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})",
+            args,
+        )
+
+    async def compact(self):
+        """Evict idle threads, re-apply the per-thread cap and release free pages."""
+        await self.setup()
+        async with self.lock:
+            if self.thread_ttl:
+                cursor = await self.conn.execute(
+                    "SELECT thread_id FROM thread_activity WHERE last_used < ?",
+                    (time.time() - self.thread_ttl,),
+                )
+                idle = [row[0] for row in await cursor.fetchall()]
+                for thread_id in idle:
+                    for table in ("checkpoints", "writes", "thread_activity"):
+                        await self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                self.evicted_threads += len(idle)
+            if self.max_per_thread:
+                # Catches threads written before the cap was lowered
+                cursor = await self.conn.execute(
+                    "SELECT thread_id, checkpoint_ns FROM checkpoints "
+                    "GROUP BY thread_id, checkpoint_ns HAVING COUNT(*) > ?",
+                    (self.max_per_thread,),
+                )
+                for thread_id, checkpoint_ns in await cursor.fetchall():
+                    await self._prune_thread(thread_id, checkpoint_ns)
+            await self.conn.commit()
+            await self.conn.execute("PRAGMA incremental_vacuum")
+            await self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        logger.info("Checkpoint compaction done: %s", self.stats())
+
+    def start_compaction(self, interval=CHECKPOINT_COMPACT_INTERVAL):
+        if interval and self._compactor is None:
+            self._compactor = asyncio.create_task(self._compact_periodically(interval))
+
+    async def _compact_periodically(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.compact()
+            except Exception:
+                logger.exception("Checkpoint compaction failed")
+
+    async def aclose(self):
+        if self._compactor is not None:
+            self._compactor.cancel()
+            await asyncio.gather(self._compactor, return_exceptions=True)
+            self._compactor = None
+        await self.conn.close()
+
+    def stats(self):
+        return {
+            "max_per_thread": self.max_per_thread,
+            "thread_ttl": self.thread_ttl,
+            "evicted_threads": self.evicted_threads,
+            "pruned_checkpoints": self.pruned_checkpoints,
+        }
+
+
+async def create_checkpointer(kind=CHECKPOINTER):
+    """Return the checkpointer selected by CHECKPOINTER ("sqlite" or "memory")."""
+    if kind == "memory":
+        return MemorySaver()
+    if kind != "sqlite":
+        raise ValueError(f"Unknown CHECKPOINTER: {kind}")
+
+    directory = os.path.dirname(CHECKPOINT_DB_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = await aiosqlite.connect(CHECKPOINT_DB_PATH)
+    saver = BoundedSqliteSaver(conn)
+    await saver.setup()
+    await saver.compact()
+    saver.start_compaction()
+    return saver
+
+
+async def close_checkpointer(saver):
+    if isinstance(saver, BoundedSqliteSaver):
+        await saver.aclose()
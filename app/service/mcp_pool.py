@@ -0,0 +1,209 @@
+import asyncio
+import logging
+
+from langchain_core.tools import StructuredTool, ToolException
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from app.config import (
+    MCP_CONFIG, MCP_POOL_SIZE, MCP_HEARTBEAT_INTERVAL, MCP_PING_TIMEOUT, MCP_START_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MCPWorker:
+    """One set of MCP server subprocesses, owned by a task that keeps its client open."""
+
+    def __init__(self, index, config):
+        self.index = index
+        self.config = config
+        self.client = None
+        self.tools = {}
+        self.healthy = False
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.restarts = 0
+        self._task = None
+        self._stop = None
+
+    async def start(self, timeout=MCP_START_TIMEOUT):
+        # The stdio transport must be entered and exited by the same task, so the
+        # client lives in its own task for as long as the worker runs
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready))
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), timeout)
+        except Exception:
+            await self.stop()
+            raise
+
+    async def _run(self, ready):
+        try:
+            async with MultiServerMCPClient(self.config) as client:
+                self.client = client
+                self.tools = {tool.name: tool for tool in client.get_tools()}
+                self.healthy = True
+                ready.set_result(None)
+                await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            elif self._stop.is_set():
+                # Closing the transport of a server that already died fails too
+                logger.debug("MCP worker %d closed with an error: %r", self.index, e)
+            else:
+                logger.exception("MCP worker %d stopped unexpectedly", self.index)
+        finally:
+            self.healthy = False
+            self.client = None
+
+    async def stop(self, timeout=MCP_PING_TIMEOUT):
+        self.healthy = False
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except Exception:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def restart(self):
+        await self.stop()
+        self.restarts += 1
+        await self.start()
+
+    async def ping(self, timeout=MCP_PING_TIMEOUT):
+        if not self.healthy or self.client is None:
+            raise ConnectionError(f"MCP worker {self.index} is not running")
+        for session in list(self.client.sessions.values()):
+            await asyncio.wait_for(session.send_ping(), timeout)
+
+
+class MCPPool:
+    """A fixed pool of MCP server subprocesses behind one set of LangChain tools.
+
+    Each tool call goes to the healthy worker with the fewest calls in flight.
+    A heartbeat pings every worker and restarts the ones that stopped answering,
+    and a worker whose call fails with anything but a tool error is restarted
+    right away.
+    """
+
+    def __init__(self, config=MCP_CONFIG, size=MCP_POOL_SIZE, heartbeat_interval=MCP_HEARTBEAT_INTERVAL):
+        self.config = config
+        self.size = size
+        self.heartbeat_interval = heartbeat_interval
+        self.workers = [MCPWorker(i, config) for i in range(size)]
+        self._tools = []
+        self._heartbeat = None
+        # worker index -> task restarting it
+        self._restarting = {}
+
+    async def start(self):
+        """Start every worker concurrently; at least one has to come up."""
+        results = await asyncio.gather(*(worker.start() for worker in self.workers), return_exceptions=True)
+        for worker, result in zip(self.workers, results):
+            if isinstance(result, BaseException):
+                logger.error("MCP worker %d failed to start: %s", worker.index, result)
+        started = [worker for worker in self.workers if worker.healthy]
+        if not started:
+            raise RuntimeError("No MCP server could be started")
+        self._tools = [self._proxy(tool) for tool in started[0].tools.values()]
+        if self.heartbeat_interval:
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        logger.info("MCP pool started with %d of %d workers", len(started), self.size)
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+        for task in list(self._restarting.values()):
+            task.cancel()
+        await asyncio.gather(*self._restarting.values(), return_exceptions=True)
+        await asyncio.gather(*(worker.stop() for worker in self.workers), return_exceptions=True)
+
+    def get_tools(self):
+        return list(self._tools)
+
+    def _proxy(self, tool):
+        async def call_tool(**arguments):
+            return await self.call(tool.name, arguments)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=call_tool,
+            response_format="content_and_artifact",
+        )
+
+    def _pick(self):
+        healthy = [worker for worker in self.workers if worker.healthy]
+        if not healthy:
+            return None
+        return min(healthy, key=lambda worker: (worker.in_flight, worker.calls))
+
+    async def call(self, name, arguments):
+        worker = self._pick()
+        if worker is None:
+            raise ToolException("The Google Drive tools are restarting. Please try again shortly.")
+        worker.in_flight += 1
+        worker.calls += 1
+        try:
+            return await worker.tools[name].coroutine(**arguments)
+        except ToolException:
+            raise
+        except Exception:
+            # Transport errors mean the subprocess is gone or wedged
+            worker.failures += 1
+            self._schedule_restart(worker)
+            raise
+        finally:
+            worker.in_flight -= 1
+
+    def _schedule_restart(self, worker):
+        if worker.index in self._restarting:
+            return
+        worker.healthy = False
+        self._restarting[worker.index] = asyncio.create_task(self._restart(worker))
+
+    async def _restart(self, worker):
+        try:
+            await worker.restart()
+            logger.info("MCP worker %d restarted", worker.index)
+        except Exception as e:
+            logger.error("MCP worker %d failed to restart: %s", worker.index, e)
+        finally:
+            self._restarting.pop(worker.index, None)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for worker in self.workers:
+                if worker.index in self._restarting:
+                    continue
+                try:
+                    await worker.ping()
+                except Exception as e:
+                    logger.warning("MCP worker %d failed its heartbeat: %r", worker.index, e)
+                    self._schedule_restart(worker)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "healthy": sum(worker.healthy for worker in self.workers),
+            "workers": [
+                {
+                    "healthy": worker.healthy,
+                    "in_flight": worker.in_flight,
+                    "calls": worker.calls,
+                    "failures": worker.failures,
+                    "restarts": worker.restarts,
+                }
+                for worker in self.workers
+            ],
+        }
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from app.config import WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, WEBHOOK_DRAIN_TIMEOUT
+from app.service.agent_service import process_message, scheduler, mcp_pool, BUSY_MESSAGE
+from app.service.twilio_service import send_whatsapp_message_async
+
+logger = logging.getLogger(__name__)
+
+# Recent latencies kept for percentile metrics
+LATENCY_WINDOW = 1000
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class JobQueue:
+    """In-process async job queue served by a fixed pool of worker tasks."""
+
+    def __init__(self, handler, workers=WEBHOOK_WORKERS, maxsize=WEBHOOK_QUEUE_SIZE):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue = None
+        self._tasks = []
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._waits = deque(maxlen=LATENCY_WINDOW)
+        self._runs = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self, timeout=WEBHOOK_DRAIN_TIMEOUT):
+        """Let queued jobs finish for up to timeout seconds, then cancel the workers."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %d queued jobs on shutdown", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, *args):
+        """Enqueue a job without waiting. Returns False when the queue is full."""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started")
+        try:
+            self._queue.put_nowait((time.monotonic(), args))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        return True
+
+    async def _worker(self, index):
+        while True:
+            enqueued_at, args = await self._queue.get()
+            started = time.monotonic()
+            self._waits.append(started - enqueued_at)
+            self.in_flight += 1
+            try:
+                await self.handler(*args)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Job failed in worker %d", index)
+            finally:
+                self.in_flight -= 1
+                self._runs.append(time.monotonic() - started)
+                self._queue.task_done()
+
+    def metrics(self):
+        waits, runs = list(self._waits), list(self._runs)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.maxsize,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_seconds_p50": _percentile(waits, 0.5),
+            "wait_seconds_p95": _percentile(waits, 0.95),
+            "run_seconds_p50": _percentile(runs, 0.5),
+            "run_seconds_p95": _percentile(runs, 0.95),
+            "agent": scheduler.stats(),
+            "mcp": mcp_pool.stats(),
+        }
+
+
+async def handle_message(sender: str, message: str, thread_id: str):
+    response_msg = await process_message(message, thread_id)
+    print(f"response: {response_msg}, threadid: {thread_id}")
+    await send_whatsapp_message_async(sender, response_msg)
+
+
+message_queue = JobQueue(handle_message)
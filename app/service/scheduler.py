@@ -0,0 +1,65 @@
+import asyncio
+
+
+BUSY_MESSAGE = "I'm handling a lot of messages right now. Please try again in a minute."
+
+
+class SchedulerBusy(Exception):
+    pass
+
+
+class ThreadScheduler:
+    """Runs one message at a time per thread_id and at most max_concurrency overall.
+
+    Once every slot is busy and max_queued messages are already waiting, new
+    messages are rejected with SchedulerBusy. Every waiting message holds a
+    webhook worker, so max_queued must stay below the workers left over by the
+    running messages for the limit to ever be reached.
+    """
+
+    def __init__(self, max_concurrency, max_queued):
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # thread_id -> [lock, number of messages holding or waiting for it]
+        self._threads = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def run(self, thread_id, func):
+        """Await func() once this thread's earlier messages and a global slot allow it."""
+        if self.in_flight >= self.max_concurrency and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise SchedulerBusy()
+
+        entry = self._threads.setdefault(thread_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self.queued += 1
+        waiting = True
+        try:
+            async with entry[0]:
+                async with self._slots:
+                    self.queued -= 1
+                    waiting = False
+                    self.in_flight += 1
+                    try:
+                        return await func()
+                    finally:
+                        self.in_flight -= 1
+        finally:
+            if waiting:
+                self.queued -= 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._threads[thread_id]
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "active_threads": len(self._threads),
+            "max_concurrency": self.max_concurrency,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+        }
@@ -1,3 +1,4 @@
+import asyncio
 from app.config import twilio_client, TWILIO_WHATSAPP_NUMBER
 
 def send_whatsapp_message(to: str, body: str):
@@ -6,3 +7,7 @@ def send_whatsapp_message(to: str, body: str):
         from_=TWILIO_WHATSAPP_NUMBER,
         to=to
     )
+
+async def send_whatsapp_message_async(to: str, body: str):
+    # The Twilio client is blocking; run it off the event loop
+    await asyncio.to_thread(send_whatsapp_message, to, body)
@@ -0,0 +1,268 @@
+"""
+Google Drive AI Agent: Document Content Cache
+A process-wide cache of extracted document content shared by all content tools.
+
+Entries are keyed by file ID plus the Drive version of the file, so an edited file
+never serves stale content. The in-memory tier is bounded by a byte budget with
+LRU eviction and a TTL, and keeps hit/miss/eviction counters. A second, on-disk
+tier keeps extracted text across restarts, keyed by md5Checksum or version.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Total size of cached content, in bytes
+CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds an entry stays valid after it was stored
+CONTENT_CACHE_TTL = int(os.getenv("CONTENT_CACHE_TTL", "3600"))
+# Directory of the persistent content cache; empty disables it
+CONTENT_CACHE_DIR = os.getenv("CONTENT_CACHE_DIR", ".cache/content")
+# Total size of the persistent content cache, in bytes
+CONTENT_CACHE_DISK_MAX_BYTES = int(os.getenv("CONTENT_CACHE_DISK_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+
+def content_version(metadata):
+    """Return the version component of a cache key from Drive file metadata."""
+    return str(metadata.get('version') or metadata.get('modifiedTime') or '')
+
+
+def disk_version(metadata):
+    """Return the version used by the disk cache: the content hash when Drive has one."""
+    return str(metadata.get('md5Checksum') or content_version(metadata))
+
+
+def _digest(value):
+    return hashlib.sha256(str(value).encode('utf-8')).hexdigest()[:32]
+
+
+def estimate_size(value):
+    """Rough in-memory size of a cached read_file result."""
+    if isinstance(value, dict):
+        return sum(sys.getsizeof(v) for v in value.values()) + sys.getsizeof(value)
+    return sys.getsizeof(value)
+
+
+class ContentCache:
+    """Thread-safe LRU/TTL cache with a byte budget.
+
+    Keys are tuples whose first two items are the file ID and its version.
+    Storing a new version of a file drops the entries for older versions.
+    """
+
+    def __init__(self, max_bytes=CONTENT_CACHE_MAX_BYTES, ttl=CONTENT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_file = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires'] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['value']
+
+    def put(self, key, value, size=None):
+        """Store a value, evicting least recently used entries to fit the budget."""
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        file_id, version = key[0], key[1]
+        with self._lock:
+            # Drop entries for other versions of the same file
+            for old_key in list(self._by_file.get(file_id, ())):
+                if old_key == key or old_key[1] != version:
+                    self._remove(old_key)
+            self._entries[key] = {
+                'value': value,
+                'size': size,
+                'expires': time.monotonic() + self.ttl,
+            }
+            self._by_file.setdefault(file_id, set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, file_id):
+        """Drop every cached entry for a file."""
+        with self._lock:
+            for key in list(self._by_file.get(file_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_file.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry['size']
+        keys = self._by_file.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_file[key[0]]
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current usage."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class DiskContentCache:
+    """Persistent cache of read_file results stored as JSON files.
+
+    Each file gets its own directory; entries are named after the version and an
+    optional variant (such as the PDF page limit). Writing a new version removes
+    the older ones, and the total size is kept under a byte budget by removing the
+    least recently used entries.
+    """
+
+    def __init__(self, directory=CONTENT_CACHE_DIR, max_bytes=CONTENT_CACHE_DISK_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _file_dir(self, file_id):
+        return os.path.join(self.directory, _digest(file_id))
+
+    def _path(self, file_id, version, variant=None):
+        name = _digest(version)
+        if variant is not None:
+            name += f"-{variant}"
+        return os.path.join(self._file_dir(file_id), name + ".json")
+
+    def get(self, file_id, version, variant=None):
+        """Return the stored result for this file version, or None."""
+        if not self.enabled:
+            return None
+        path = self._path(file_id, version, variant)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            # Touch the entry so pruning removes the least recently used ones
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Discarding unreadable cache entry %s: %s", path, e)
+            self._unlink(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, file_id, version, value, variant=None):
+        """Store a JSON-serializable result, replacing older versions of the file."""
+        if not self.enabled:
+            return
+        file_dir = self._file_dir(file_id)
+        path = self._path(file_id, version, variant)
+        version_prefix = _digest(version)
+        try:
+            os.makedirs(file_dir, exist_ok=True)
+            # Write to a temporary file first so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=file_dir, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not write cache entry for %s: %s", file_id, e)
+            return
+
+        with self._lock:
+            for entry in os.scandir(file_dir):
+                if not entry.name.startswith(version_prefix) and entry.name.endswith(".json"):
+                    self._unlink(entry.path)
+            if self._bytes is not None:
+                self._bytes += os.path.getsize(path) - replaced
+            self._prune()
+
+    def invalidate(self, file_id):
+        """Remove every stored version of a file."""
+        if not self.enabled:
+            return
+        file_dir = self._file_dir(file_id)
+        if os.path.isdir(file_dir):
+            with self._lock:
+                for entry in os.scandir(file_dir):
+                    self._unlink(entry.path)
+
+    def _entries(self):
+        for file_dir in os.scandir(self.directory):
+            if file_dir.is_dir():
+                for entry in os.scandir(file_dir.path):
+                    if entry.name.endswith(".json"):
+                        yield entry
+
+    def _prune(self):
+        if self._bytes is None:
+            self._bytes = sum(entry.stat().st_size for entry in self._entries())
+        if self._bytes <= self.max_bytes:
+            return
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        for entry in entries:
+            if self._bytes <= self.max_bytes:
+                break
+            self._unlink(entry.path)
+
+    def _unlink(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        if self._bytes is not None:
+            self._bytes -= size
+
+
+# Shared by every tool in the process
+content_cache = ContentCache()
+disk_content_cache = DiskContentCache()
@@ -0,0 +1,160 @@
+"""
+Google Drive AI Agent: Context Budget
+Token-budgeted conversation context for the agents.
+
+Tool outputs such as file previews and metadata listings dominate a Drive
+conversation, and they are rarely needed again once the model has answered from
+them. Before each model call the context is rebuilt from the stored history:
+
+- the most recent turns (a turn starts at a human message) are kept verbatim;
+- tool outputs of older turns are collapsed into a short reference, keeping the
+  tool call ids so the tool-call/response pairing stays valid;
+- if that is still over the hard token ceiling, the recent turns other than the
+  current one are collapsed as well, and then the oldest turns are dropped;
+- tool outputs of the current turn are truncated if it alone does not fit.
+
+The stored history itself is never modified.
+"""
+
+import os
+import json
+import logging
+
+from langchain_core.messages import SystemMessage, ToolMessage, trim_messages
+
+logger = logging.getLogger(__name__)
+
+# Hard ceiling on the prompt tokens sent with one model call
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "16000"))
+# Turns at the end of the conversation whose tool outputs are kept verbatim
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "2"))
+# Characters of an older tool output kept in its collapsed reference
+CONTEXT_TOOL_PREVIEW_CHARS = int(os.getenv("CONTEXT_TOOL_PREVIEW_CHARS", "300"))
+
+# Per-message overhead of the chat format (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_NOTE_TOKENS = 32
+
+
+class ContextBudget:
+    """Fits a message list into a token budget; callable as a LangGraph agent prompt."""
+
+    def __init__(self, max_tokens=CONTEXT_MAX_TOKENS, recent_turns=CONTEXT_RECENT_TURNS,
+                 preview_chars=CONTEXT_TOOL_PREVIEW_CHARS, system_prompt=None, model="gpt-4o"):
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.preview_chars = preview_chars
+        self.system_prompt = system_prompt
+        try:
+            import tiktoken
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.debug("Estimating prompt tokens from text length: %s", e)
+            self._encoding = None
+
+    def __call__(self, state):
+        """Build the prompt of a create_react_agent model call from the graph state."""
+        messages = list(state["messages"] if isinstance(state, dict) else state.messages)
+        if self.system_prompt:
+            messages.insert(0, SystemMessage(content=self.system_prompt))
+        return self.fit(messages)
+
+    def count_text(self, text):
+        if self._encoding is None:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_message(self, message):
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        tokens = self.count_text(content) + MESSAGE_OVERHEAD_TOKENS
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            tokens += self.count_text(json.dumps([[call["name"], call["args"]] for call in tool_calls]))
+        return tokens
+
+    def fit(self, messages):
+        """Return messages collapsed and trimmed to at most max_tokens."""
+        messages = list(messages)
+        starts = self._turn_starts(messages)
+        if not starts:
+            return messages
+
+        # Counts are computed once per message; trim_messages re-counts many sublists
+        counts = {}
+
+        def count(batch):
+            total = 0
+            for message in batch:
+                key = id(message)
+                if key not in counts:
+                    counts[key] = self.count_message(message)
+                total += counts[key]
+            return total
+
+        if len(starts) > self.recent_turns:
+            messages = self._collapse_before(messages, starts[-self.recent_turns] if self.recent_turns else len(messages))
+        if count(messages) > self.max_tokens:
+            # Recent turns are shortened too before any turn is dropped
+            messages = self._collapse_before(messages, starts[-1])
+
+        # The current turn is always sent, shrunk if it alone is over budget
+        system = [m for m in messages[:starts[0]] if isinstance(m, SystemMessage)]
+        turn = self._shrink(messages[starts[-1]:], self.max_tokens - count(system))
+        messages = messages[:starts[-1]] + turn
+        if count(messages) <= self.max_tokens:
+            return messages
+        trimmed = trim_messages(
+            messages,
+            max_tokens=self.max_tokens,
+            token_counter=count,
+            strategy="last",
+            start_on="human",
+            include_system=True,
+        )
+        return trimmed if any(m.type == "human" for m in trimmed) else system + turn
+
+    @staticmethod
+    def _turn_starts(messages):
+        return [i for i, message in enumerate(messages) if message.type == "human"]
+
+    def _collapse_before(self, messages, cutoff):
+        return [self._collapse(m) if i < cutoff else m for i, m in enumerate(messages)]
+
+    def _collapse(self, message):
+        """Replace a long tool output with a short reference to it."""
+        if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+            return message
+        if len(message.content) <= self.preview_chars:
+            return message
+        preview = message.content[:self.preview_chars].rstrip()
+        content = (f"[Earlier {message.name or 'tool'} output, {len(message.content)} characters, shortened; "
+                   f"call the tool again if the details are needed]\n{preview}...")
+        return message.model_copy(update={"content": content})
+
+    def _shrink(self, turn, budget):
+        """Truncate the largest tool outputs of a turn until it fits budget tokens."""
+        turn = list(turn)
+        over = sum(self.count_message(m) for m in turn) - budget
+        tools = sorted(
+            (i for i, m in enumerate(turn) if isinstance(m, ToolMessage) and isinstance(m.content, str)),
+            key=lambda i: len(turn[i].content), reverse=True
+        )
+        for i in tools:
+            if over <= 0:
+                break
+            message = turn[i]
+            tokens = self.count_message(message)
+            # Leaves room for the truncation note
+            keep_tokens = max(self.preview_chars // 4, tokens - over - TRUNCATION_NOTE_TOKENS)
+            # Cut by characters in proportion to the tokens that must go
+            keep_chars = int(len(message.content) * keep_tokens / tokens)
+            if keep_chars >= len(message.content):
+                continue
+            content = (message.content[:keep_chars].rstrip()
+                       + f"\n[Output truncated from {len(message.content)} characters to fit the context budget]")
+            turn[i] = message.model_copy(update={"content": content})
+            over -= tokens - self.count_message(turn[i])
+        return turn
@@ -0,0 +1,180 @@
+"""
+Google Drive AI Agent: Download Helpers
+Ways of getting file bytes out of Google Drive without holding whole files in RAM.
+
+download_media runs a get_media/export_media request in chunks of a tunable size
+into a SpooledTemporaryFile, which moves to disk once it grows past a threshold,
+and reports progress and throughput.
+
+DriveRangeFile is a seekable, read-only file object whose bytes are fetched on
+demand with HTTP Range requests and spooled to a temporary file. Parsers that
+seek around (like PyPDF2, which reads the cross-reference table at the end and
+then only the objects of the pages it is asked for) download just what they touch.
+"""
+
+import io
+import os
+import time
+import logging
+import tempfile
+
+from googleapiclient.http import MediaIoBaseDownload
+
+logger = logging.getLogger(__name__)
+
+# Bytes requested per chunk when downloading or exporting files
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+# Downloads larger than this are spooled to a temporary file instead of RAM
+DOWNLOAD_SPOOL_THRESHOLD = int(os.getenv("DOWNLOAD_SPOOL_THRESHOLD", str(16 * 1024 * 1024)))
+
+# PDFs at least this large are read lazily with Range requests
+PDF_RANGE_THRESHOLD = int(os.getenv("PDF_RANGE_THRESHOLD", str(8 * 1024 * 1024)))
+# Granularity of Range requests
+PDF_RANGE_BLOCK_SIZE = int(os.getenv("PDF_RANGE_BLOCK_SIZE", str(512 * 1024)))
+
+
+def log_progress(progress):
+    """Default progress callback: log each chunk at debug level."""
+    total = progress['total_bytes']
+    logger.debug(
+        "Downloading %s: %d/%s bytes (%.1f KB/s)",
+        progress['label'], progress['bytes'], total if total else '?',
+        progress['throughput'] / 1024
+    )
+
+
+def download_media(request, chunk_size=DOWNLOAD_CHUNK_SIZE, spool_threshold=DOWNLOAD_SPOOL_THRESHOLD,
+                   progress_callback=log_progress, label=None):
+    """Download a media request into a spooled temporary file.
+
+    Returns the file (positioned at the start) and a stats dict with the byte
+    count, elapsed seconds, throughput in bytes/s and whether it spilled to disk.
+    The caller is responsible for closing the file.
+    """
+    file_content = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+    downloader = MediaIoBaseDownload(file_content, request, chunksize=chunk_size)
+    start = time.monotonic()
+    done = False
+    try:
+        while not done:
+            status, done = downloader.next_chunk()
+            if progress_callback is not None:
+                elapsed = max(time.monotonic() - start, 1e-6)
+                downloaded = file_content.tell()
+                progress_callback({
+                    'label': label,
+                    'bytes': downloaded,
+                    'total_bytes': status.total_size if status else None,
+                    'elapsed': elapsed,
+                    'throughput': downloaded / elapsed,
+                })
+    except Exception:
+        file_content.close()
+        raise
+
+    elapsed = max(time.monotonic() - start, 1e-6)
+    size = file_content.tell()
+    stats = {
+        'label': label,
+        'bytes': size,
+        'seconds': elapsed,
+        'throughput': size / elapsed,
+        'spooled_to_disk': size > spool_threshold,
+    }
+    logger.info(
+        "Downloaded %s: %d bytes in %.2fs (%.1f KB/s)%s",
+        label, size, elapsed, stats['throughput'] / 1024,
+        " [spooled to disk]" if stats['spooled_to_disk'] else ""
+    )
+    file_content.seek(0)
+    return file_content, stats
+
+
+class DriveRangeFile(io.RawIOBase):
+    """Read-only view of a Drive file that downloads byte ranges on demand."""
+
+    def __init__(self, service, file_id, size, block_size=PDF_RANGE_BLOCK_SIZE):
+        super().__init__()
+        self.service = service
+        self.file_id = file_id
+        self.size = size
+        self.block_size = block_size
+        self.bytes_fetched = 0
+        self.requests = 0
+        self._pos = 0
+        self._fetched = set()
+        self._spool = tempfile.TemporaryFile()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"Negative seek position {pos}")
+        self._pos = pos
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._pos >= self.size:
+            return 0
+        length = min(len(buffer), self.size - self._pos)
+        self._ensure(self._pos, self._pos + length)
+        self._spool.seek(self._pos)
+        read = self._spool.readinto(memoryview(buffer)[:length])
+        self._pos += read
+        return read
+
+    def _ensure(self, start, end):
+        """Make sure bytes [start, end) are in the spool file."""
+        first = start // self.block_size
+        last = (end - 1) // self.block_size
+        run_start = None
+        for block in range(first, last + 2):
+            missing = block <= last and block not in self._fetched
+            if missing and run_start is None:
+                run_start = block
+            elif not missing and run_start is not None:
+                # Fetch each run of consecutive missing blocks with one request
+                self._fetch_blocks(run_start, block - 1)
+                run_start = None
+
+    def _fetch_blocks(self, first, last):
+        start = first * self.block_size
+        end = min(self.size, (last + 1) * self.block_size) - 1
+        request = self.service.files().get_media(fileId=self.file_id)
+        request.headers['Range'] = f"bytes={start}-{end}"
+        data = request.execute()
+        self._spool.seek(start)
+        self._spool.write(data)
+        self._fetched.update(range(first, last + 1))
+        self.bytes_fetched += len(data)
+        self.requests += 1
+
+    def close(self):
+        if not self.closed:
+            self._spool.close()
+            logger.debug(
+                "Range reader for %s fetched %d of %d bytes in %d requests",
+                self.file_id, self.bytes_fetched, self.size, self.requests
+            )
+        super().close()
+
+
+def open_range_reader(service, file_id, size, block_size=PDF_RANGE_BLOCK_SIZE):
+    """Return a buffered, seekable file object over a Drive file's bytes."""
+    return io.BufferedReader(DriveRangeFile(service, file_id, size, block_size),
+                             buffer_size=min(block_size, 64 * 1024))
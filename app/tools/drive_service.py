@@ -0,0 +1,257 @@
+"""
+Google Drive AI Agent: Shared Drive Service
+Process-wide credential and service manager used by all Google Drive tools.
+
+Credentials are loaded once, refreshed proactively by a background thread before
+they expire, and each worker thread gets its own authorized ``Http`` object (and
+Drive service bound to it) so concurrent tool calls reuse warm connections
+instead of rebuilding the client on every call. iter_files pages through
+files().list lazily so large listings never have to fit in memory, and keeps
+recently fetched pages so a listing continued from a cursor never lists the
+files it has already returned again.
+"""
+
+import os
+import json
+import time
+import pickle
+import threading
+import datetime
+import logging
+from collections import OrderedDict
+
+import httplib2
+import google_auth_httplib2
+from googleapiclient.discovery import build
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+
+logger = logging.getLogger(__name__)
+
+# Define the scopes required for Google Drive access
+SCOPES = ["https://www.googleapis.com/auth/drive",
+  "https://www.googleapis.com/auth/spreadsheets"]
+
+TOKEN_PATH = os.getenv("GDRIVE_TOKEN_PATH", "token.pickle")
+CREDENTIALS_PATH = os.getenv("GDRIVE_CREDENTIALS_PATH", "credentials.json")
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = int(os.getenv("GDRIVE_TOKEN_REFRESH_MARGIN", "300"))
+# Socket timeout for the per-thread Http objects
+HTTP_TIMEOUT = int(os.getenv("GDRIVE_HTTP_TIMEOUT", "60"))
+
+
+class DriveServiceManager:
+    """Thread-safe owner of the Drive credentials and per-thread services."""
+
+    def __init__(self, token_path=TOKEN_PATH, credentials_path=CREDENTIALS_PATH,
+                 scopes=None, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.token_path = token_path
+        self.credentials_path = credentials_path
+        self.scopes = scopes or SCOPES
+        self.refresh_margin = refresh_margin
+        self._creds = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._refresh_thread = None
+        self._stop_event = threading.Event()
+
+    def _load_credentials(self):
+        """Load credentials from disk, refreshing or re-authorizing if needed."""
+        creds = None
+        # Load credentials from token.pickle if it exists
+        if os.path.exists(self.token_path):
+            with open(self.token_path, 'rb') as token:
+                creds = pickle.load(token)
+
+        # If credentials don't exist or are invalid, get new ones
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.credentials_path, self.scopes)
+                creds = flow.run_local_server(port=0)
+            self._save_credentials(creds)
+
+        return creds
+
+    def _save_credentials(self, creds):
+        """Save the credentials for the next run."""
+        with open(self.token_path, 'wb') as token:
+            pickle.dump(creds, token)
+
+    def get_credentials(self):
+        """Return the shared credentials, loading them on first use."""
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load_credentials()
+                self._start_refresh_thread()
+            return self._creds
+
+    def _seconds_until_refresh(self):
+        """Seconds until the token should be refreshed (0 if it is due now)."""
+        expiry = self._creds.expiry if self._creds else None
+        if expiry is None:
+            return self.refresh_margin
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.datetime.utcnow()
+        remaining = (expiry - now).total_seconds() - self.refresh_margin
+        return max(0, remaining)
+
+    def refresh_credentials(self):
+        """Refresh the shared access token and persist it."""
+        with self._lock:
+            if self._creds is None or not self._creds.refresh_token:
+                return
+            self._creds.refresh(Request())
+            self._save_credentials(self._creds)
+            logger.debug("Refreshed Google Drive access token, expires at %s", self._creds.expiry)
+
+    def _refresh_loop(self):
+        """Background loop refreshing the token shortly before it expires."""
+        while not self._stop_event.is_set():
+            with self._lock:
+                wait = self._seconds_until_refresh()
+            if self._stop_event.wait(wait):
+                break
+            try:
+                self.refresh_credentials()
+            except Exception as e:
+                logger.warning("Proactive token refresh failed: %s", e)
+                # Back off before trying again; AuthorizedHttp still refreshes on 401
+                self._stop_event.wait(min(60, self.refresh_margin))
+
+    def _start_refresh_thread(self):
+        if self._refresh_thread is not None or not self._creds.refresh_token:
+            return
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, name="drive-token-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def get_http(self):
+        """Return this thread's authorized Http object."""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.get_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT))
+            self._local.http = http
+        return http
+
+    def get_service(self):
+        """Return this thread's Drive v3 service, building it on first use."""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('drive', 'v3', http=self.get_http(), cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def close(self):
+        """Stop the background refresh thread."""
+        self._stop_event.set()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_service_manager():
+    """Return the process-wide DriveServiceManager."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = DriveServiceManager()
+    return _manager
+
+
+def get_drive_service():
+    """Authenticate and return the Google Drive service for the current thread."""
+    return get_service_manager().get_service()
+
+
+# Largest page files().list will return
+LIST_PAGE_SIZE = 1000
+# Listing pages kept for continuations, and for how many seconds
+LIST_PAGE_CACHE_SIZE = int(os.getenv("LIST_PAGE_CACHE_SIZE", "32"))
+LIST_PAGE_CACHE_TTL = float(os.getenv("LIST_PAGE_CACHE_TTL", "300"))
+
+
+class ListPageCache:
+    """Small LRU/TTL cache of files().list pages keyed by their request parameters."""
+
+    def __init__(self, max_entries=LIST_PAGE_CACHE_SIZE, ttl=LIST_PAGE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._pages[key]
+                return None
+            self._pages.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, page):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._pages[key] = (time.monotonic() + self.ttl, page)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+
+list_page_cache = ListPageCache()
+
+
+def make_cursor(page_token, offset):
+    """Encode a resume position: the token of a page and an offset within it."""
+    return f"{page_token or ''}:{offset}"
+
+
+def parse_cursor(cursor):
+    """Decode a cursor produced by make_cursor into (page_token, offset)."""
+    if not cursor:
+        return None, 0
+    page_token, _, offset = cursor.rpartition(':')
+    try:
+        return page_token or None, int(offset)
+    except ValueError:
+        # A bare Drive page token
+        return cursor, 0
+
+
+def iter_files(service, q=None, fields="id, name", page_size=LIST_PAGE_SIZE, cursor=None, **kwargs):
+    """Lazily iterate over files().list results, following nextPageToken.
+
+    Yields (item, cursor) pairs, where cursor resumes the listing at that item.
+    Only one page is held in memory at a time. Fetched pages are remembered, so
+    resuming from a cursor inside a page reuses it instead of listing it again;
+    a listing started without a cursor always asks Drive.
+    """
+    page_token, offset = parse_cursor(cursor)
+    resuming = cursor is not None
+    while True:
+        params = dict(kwargs, pageSize=page_size, fields=f"nextPageToken, files({fields})")
+        if q:
+            params['q'] = q
+        if page_token:
+            params['pageToken'] = page_token
+        key = json.dumps(params, sort_keys=True)
+        response = list_page_cache.get(key) if resuming else None
+        if response is None:
+            response = service.files().list(**params).execute()
+            list_page_cache.put(key, response)
+        resuming = True
+        files = response.get('files', [])
+        for index in range(offset, len(files)):
+            yield files[index], make_cursor(page_token, index)
+        page_token = response.get('nextPageToken')
+        offset = 0
+        if not page_token:
+            return
@@ -0,0 +1,211 @@
+"""
+Google Drive AI Agent: Embedding Cache
+Content-addressed cache of chunk embeddings shared by every document and version.
+
+Vectors are keyed by a hash of the embedding model name and the chunk text, so
+boilerplate, templates and unchanged sections of an edited document are embedded
+only once. They are stored as float32 rows in a memory-mapped file per model,
+with a small SQLite index mapping hashes to rows. When the cache is full, the
+least recently used rows are reused. Rows are allocated and read in immediate
+SQLite transactions, so processes sharing the cache directory never pick the
+same row or read a row that another process is overwriting.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+# Most vectors kept per model (1536-dim float32 vectors take 6 KB each)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+# Rows added each time the vector file grows
+GROW_ROWS = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    hash TEXT PRIMARY KEY,
+    row INTEGER NOT NULL UNIQUE,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slots_by_use ON slots (last_used);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def chunk_hash(model, text):
+    """Cache key of a chunk: the hash of the model name and the exact text."""
+    return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Float32 vectors in a memory-mapped file, indexed by content hash."""
+
+    def __init__(self, model, directory=EMBEDDING_CACHE_DIR, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.model = model
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, re.sub(r'[^A-Za-z0-9._-]', '_', model))
+        self._data_path = base + ".f32"
+        self._conn = sqlite3.connect(base + ".sqlite3", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._dim = None
+        self._load_dim()
+        self._vectors = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load_dim(self):
+        # Another process may have stored the first vector
+        if self._dim is None:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            self._dim = int(row[0]) if row else None
+        return self._dim
+
+    def _capacity(self):
+        if self._dim is None or not os.path.exists(self._data_path):
+            return 0
+        return os.path.getsize(self._data_path) // (self._dim * 4)
+
+    def _map(self, rows_needed=0):
+        """Memory-map the vector file, growing it to hold rows_needed rows."""
+        capacity = self._capacity()
+        if rows_needed > capacity:
+            capacity = min(self.max_entries, max(rows_needed, capacity + GROW_ROWS))
+            with open(self._data_path, 'ab') as f:
+                f.truncate(capacity * self._dim * 4)
+            self._vectors = None
+        elif self._vectors is not None and len(self._vectors) != capacity:
+            # Grown by another process
+            self._vectors = None
+        if self._vectors is None and capacity:
+            self._vectors = np.memmap(self._data_path, dtype=np.float32, mode='r+',
+                                      shape=(capacity, self._dim))
+        return self._vectors
+
+    def get_many(self, hashes):
+        """Return a dict of hash -> vector (list of floats) for the cached hashes."""
+        found = {}
+        with self._lock:
+            if not hashes or self._load_dim() is None:
+                self.misses += len(hashes)
+                return {}
+            hashes = list(hashes)
+            with self._conn:
+                # The vector file is not versioned like the SQLite snapshot, so rows
+                # are read under the write lock: another process cannot evict and
+                # overwrite a row between its lookup and the copy of its vector
+                self._conn.execute("BEGIN IMMEDIATE")
+                vectors = self._map()
+                for hash_, row in self._lookup_rows(hashes).items():
+                    found[hash_] = vectors[row].tolist()
+                if found:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE slots SET last_used = ? WHERE hash = ?", [(now, h) for h in found])
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def _lookup_rows(self, hashes):
+        rows = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            rows.update(self._conn.execute(
+                f"SELECT hash, row FROM slots WHERE hash IN ({','.join('?' * len(part))})", part
+            ).fetchall())
+        return rows
+
+    def put_many(self, items):
+        """Store (hash, vector) pairs, reusing least recently used rows when full."""
+        if not items:
+            return
+        with self._lock, self._conn:
+            # Takes the write lock before reading the free rows, so no other
+            # process can allocate the same ones until this transaction commits
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self._load_dim() is None:
+                self._dim = len(items[0][1])
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self._dim),))
+            # Keep each hash once and never more than fit
+            items = list(dict(items).items())[-self.max_entries:]
+            hashes = [hash_ for hash_, _ in items]
+            existing = self._lookup_rows(hashes)
+            new_items = [(hash_, vector) for hash_, vector in items if hash_ not in existing]
+            if not new_items:
+                return
+
+            # Rows are allocated densely, so the next free row is the entry count
+            used = self._conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+            rows = list(range(used, min(self.max_entries, used + len(new_items))))
+            shortfall = len(new_items) - len(rows)
+            if shortfall > 0:
+                # Evict the least recently used vectors and take their rows
+                victims = self._conn.execute(
+                    "SELECT hash, row FROM slots WHERE hash NOT IN (SELECT value FROM json_each(?)) "
+                    "ORDER BY last_used LIMIT ?",
+                    (json.dumps(hashes), shortfall)
+                ).fetchall()
+                self._conn.executemany("DELETE FROM slots WHERE hash = ?", [(hash_,) for hash_, _ in victims])
+                rows.extend(row for _, row in victims)
+
+            vectors = self._map(max(rows) + 1)
+            now = time.time()
+            assignments = list(zip(new_items, rows))
+            for (_, vector), row in assignments:
+                vectors[row] = np.asarray(vector, dtype=np.float32)
+            vectors.flush()
+            self._conn.executemany(
+                "INSERT INTO slots (hash, row, last_used) VALUES (?, ?, ?)",
+                [(hash_, row, now) for (hash_, _), row in assignments]
+            )
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries,
+                'max_entries': self.max_entries}
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends chunks missing from the cache."""
+
+    def __init__(self, underlying, model, cache=None):
+        self.underlying = underlying
+        self.model = model
+        self.cache = cache or EmbeddingCache(model)
+
+    def embed_documents(self, texts):
+        hashes = [chunk_hash(self.model, text) for text in texts]
+        found = self.cache.get_many(set(hashes))
+
+        missing = {}
+        for hash_, text in zip(hashes, texts):
+            if hash_ not in found and hash_ not in missing:
+                missing[hash_] = text
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self.cache.put_many(new_items)
+            found.update(new_items)
+            logger.debug("Embedded %d of %d chunks (%d cached)", len(missing), len(texts), len(texts) - len(missing))
+        return [list(found[hash_]) for hash_ in hashes]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
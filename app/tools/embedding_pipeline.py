@@ -0,0 +1,225 @@
+"""
+Google Drive AI Agent: Embedding Pipeline
+Batched, concurrent and rate-limit aware embedding requests.
+
+Chunks are packed into requests up to a token budget and sent concurrently.
+Concurrency adapts to the provider: it grows by one after a run of successful
+requests and is halved whenever a 429 response comes back, and the rate-limited
+batch is retried after the Retry-After delay. Requests go to any
+OpenAI-compatible /embeddings endpoint, so the pipeline can run against a local
+fake server by pointing EMBEDDING_BASE_URL at it.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BASE_URL = os.getenv("EMBEDDING_BASE_URL", os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"))
+# Most tokens and chunks packed into one embedding request
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "20000"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+# Upper bound of concurrent embedding requests; the scheduler adapts below it
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "60"))
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, or estimates them when it is unavailable."""
+
+    def __init__(self, model):
+        try:
+            import tiktoken
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.debug("Estimating embedding tokens from text length: %s", e)
+            self._encoding = None
+
+    def __call__(self, text):
+        if self._encoding is None:
+            # Roughly four characters per token for English text
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def make_batches(texts, count_tokens, max_tokens=EMBEDDING_BATCH_TOKENS, max_size=EMBEDDING_BATCH_SIZE):
+    """Split texts into (indexes, token_count) batches within the request budget.
+
+    A single text larger than the budget is sent on its own.
+    """
+    batches = []
+    indexes, tokens = [], 0
+    for index, text in enumerate(texts):
+        n = count_tokens(text)
+        if indexes and (tokens + n > max_tokens or len(indexes) >= max_size):
+            batches.append((indexes, tokens))
+            indexes, tokens = [], 0
+        indexes.append(index)
+        tokens += n
+    if indexes:
+        batches.append((indexes, tokens))
+    return batches
+
+
+class AdaptiveLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease."""
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            # One more slot after a full window of successful requests
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_rate_limited(self):
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._successes = 0
+
+
+class RateLimitedError(Exception):
+    """The embedding endpoint kept rejecting a batch after every retry."""
+
+
+class EmbeddingPipeline(Embeddings):
+    """Embeds texts through an OpenAI-compatible endpoint in concurrent batches."""
+
+    def __init__(self, model, base_url=EMBEDDING_BASE_URL, api_key=None,
+                 max_batch_tokens=EMBEDDING_BATCH_TOKENS, max_batch_size=EMBEDDING_BATCH_SIZE,
+                 max_concurrency=EMBEDDING_MAX_CONCURRENCY, max_retries=EMBEDDING_MAX_RETRIES,
+                 timeout=EMBEDDING_TIMEOUT, transport=None):
+        self.model = model
+        self.url = base_url.rstrip('/') + "/embeddings"
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.count_tokens = TokenCounter(model)
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self._client = httpx.Client(
+            timeout=timeout,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embedding")
+        self._stats_lock = threading.Lock()
+        self._stats = {'chunks': 0, 'tokens': 0, 'requests': 0, 'rate_limited': 0,
+                       'retries': 0, 'seconds': 0.0}
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        start = time.monotonic()
+        batches = make_batches(texts, self.count_tokens, self.max_batch_tokens, self.max_batch_size)
+        vectors = [None] * len(texts)
+        futures = [
+            (indexes, self._executor.submit(self._embed_batch, [texts[i] for i in indexes]))
+            for indexes, _ in batches
+        ]
+        for indexes, future in futures:
+            for index, vector in zip(indexes, future.result()):
+                vectors[index] = vector
+
+        elapsed = time.monotonic() - start
+        tokens = sum(n for _, n in batches)
+        with self._stats_lock:
+            self._stats['chunks'] += len(texts)
+            self._stats['tokens'] += tokens
+            self._stats['seconds'] += elapsed
+        logger.info("Embedded %d chunks (%d tokens) in %d requests: %.1f chunks/s, %.0f tokens/s, concurrency %d",
+                    len(texts), tokens, len(batches), len(texts) / max(elapsed, 1e-9),
+                    tokens / max(elapsed, 1e-9), self.limiter.limit)
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def _embed_batch(self, batch):
+        """Send one request, retrying rate-limited and transient failures."""
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self._client.post(self.url, json={'model': self.model, 'input': batch})
+            except httpx.TransportError as e:
+                response = None
+                error = e
+            finally:
+                self.limiter.release()
+
+            with self._stats_lock:
+                self._stats['requests'] += 1
+                if attempt:
+                    self._stats['retries'] += 1
+
+            if response is not None and response.status_code == 200:
+                self.limiter.on_success()
+                data = sorted(response.json()['data'], key=lambda item: item['index'])
+                return [item['embedding'] for item in data]
+
+            if response is not None:
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                error = f"HTTP {response.status_code}"
+                if response.status_code == 429:
+                    self.limiter.on_rate_limited()
+                    with self._stats_lock:
+                        self._stats['rate_limited'] += 1
+            if attempt == self.max_retries:
+                break
+            delay = self._retry_delay(response, attempt)
+            logger.debug("Embedding request failed (%s), retrying in %.1fs", error, delay)
+            time.sleep(delay)
+        raise RateLimitedError(f"Embedding request failed after {self.max_retries} retries: {error}")
+
+    @staticmethod
+    def _retry_delay(response, attempt):
+        if response is not None:
+            try:
+                return float(response.headers.get('retry-after'))
+            except (TypeError, ValueError):
+                pass
+        return min(30.0, 0.5 * 2 ** attempt)
+
+    def stats(self):
+        """Totals and throughput of everything embedded so far."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        seconds = max(stats['seconds'], 1e-9)
+        stats['chunks_per_second'] = stats['chunks'] / seconds
+        stats['tokens_per_second'] = stats['tokens'] / seconds
+        stats['concurrency'] = self.limiter.limit
+        return stats
@@ -6,59 +6,157 @@ This agent provides tools to interact with Google Drive for browsing files and r
 import os
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-import pickle
 import datetime
 
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 from googleapiclient.http import MediaFileUpload
 
+from app.tools.drive_service import get_drive_service, iter_files, LIST_PAGE_SIZE
+from app.tools.metadata_index import get_fresh_index
 
+# Fields needed to format a listing entry
+LIST_FIELDS = "id, name, mimeType, modifiedTime, size, owners(displayName)"
+# Upper bound on files returned by one listing call
+MAX_LIST_RESULTS = int(os.getenv("MAX_LIST_RESULTS", "1000"))
+# Cursors of listings served from the local metadata index
+INDEX_CURSOR_PREFIX = "index:"
 
-# Define the scopes required for Google Drive access
-SCOPES = ["https://www.googleapis.com/auth/drive",
-  "https://www.googleapis.com/auth/spreadsheets"]
+# Convert Google Drive mime types to more readable formats
+FRIENDLY_TYPES = {
+    'application/vnd.google-apps.document': 'Google Doc',
+    'application/vnd.google-apps.spreadsheet': 'Google Sheet',
+    'application/vnd.google-apps.presentation': 'Google Slides',
+    'application/vnd.google-apps.folder': 'Folder',
+}
 
-def get_drive_service():
-    """Authenticate and return the Google Drive service."""
-    creds = None
-    # Load credentials from token.pickle if it exists
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
+# Search keywords that select a file type
+TYPE_QUERIES = {
+    'application/vnd.google-apps.document': ['document', 'doc', 'docs', 'type:document', 'type:doc', 'type:docs'],
+    'application/vnd.google-apps.spreadsheet': ['spreadsheet', 'sheet', 'sheets', 'type:spreadsheet', 'type:sheet', 'type:sheets'],
+    'application/vnd.google-apps.presentation': ['presentation', 'slides', 'type:presentation', 'type:slides'],
+    'application/pdf': ['pdf', 'type:pdf'],
+    'application/vnd.google-apps.folder': ['folder', 'directory', 'type:folder', 'type:directory'],
+}
+
+def query_mime_type(query):
+    """Return the mime type a search query asks for, or None for free-text queries."""
+    for mime_type, keywords in TYPE_QUERIES.items():
+        if query.lower() in keywords:
+            return mime_type
+    return None
+
+def build_search_query(query):
+    """Translate a search_files query into a Drive files().list query."""
+    # Handle common file type searches more intuitively
+    mime_type = query_mime_type(query)
+    if mime_type:
+        return f"mimeType = '{mime_type}'"
     
-    # If credentials don't exist or are invalid, get new ones
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Save the credentials for the next run
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
+    words = query.split()
+    name_terms = [f"name contains '{word}'" for word in words]
+    content_terms = [f"fullText contains '{word}'" for word in words]
+    
+    name_query = " or ".join(name_terms)
+    content_query = " or ".join(content_terms)
+    return f"({name_query}) and ({content_query})"
+
+def format_file_entry(idx, item, friendly_types=False):
+    """Format one files().list item as a numbered listing entry."""
+    file_type = item.get('mimeType', 'Unknown type')
+    if friendly_types:
+        file_type = FRIENDLY_TYPES.get(file_type, file_type)
+    
+    modified_time = item.get('modifiedTime', 'Unknown')
+    if modified_time != 'Unknown':
+        # Convert to a more readable format
+        modified_time = datetime.datetime.fromisoformat(modified_time.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
     
-    # Build the Drive service
-    service = build('drive', 'v3', credentials=creds)
-    return service
+    owner = "Unknown"
+    if 'owners' in item and item['owners']:
+        owner = item['owners'][0].get('displayName', 'Unknown')
+    
+    size = item.get('size', 'Unknown')
+    if size != 'Unknown':
+        # Convert size to a readable format
+        size = f"{int(size) / 1024:.2f} KB" if int(size) < 1024 * 1024 else f"{int(size) / (1024 * 1024):.2f} MB"
+    elif friendly_types and file_type == 'Folder':
+        size = 'N/A'
+    
+    output = f"{idx}. {item['name']} ({file_type})\n"
+    output += f"   ID: {item['id']}\n"
+    output += f"   Modified: {modified_time}\n"
+    output += f"   Owner: {owner}\n"
+    output += f"   Size: {size}\n\n"
+    return output
+
+def list_files_page(service, q=None, page_size=10, cursor=None, friendly_types=False):
+    """Format up to page_size files matching q, starting at cursor.
+
+    Returns the formatted entries, how many there are, and the cursor of the
+    next file (None when the listing is exhausted).
+    """
+    limit = page_size if page_size and page_size > 0 else MAX_LIST_RESULTS
+    limit = min(limit, MAX_LIST_RESULTS)
+    
+    # Full pages are requested so every cursor of a listing points into the
+    # same pages, which iter_files keeps for the continuation
+    entries = []
+    next_cursor = None
+    for item, item_cursor in iter_files(service, q=q, fields=LIST_FIELDS,
+                                        page_size=LIST_PAGE_SIZE, cursor=cursor):
+        if len(entries) >= limit:
+            next_cursor = item_cursor
+            break
+        entries.append(format_file_entry(len(entries) + 1, item, friendly_types))
+    return "".join(entries), len(entries), next_cursor
+
+def index_for_cursor(cursor):
+    """Return the metadata index if this listing can be served from it, else None."""
+    if cursor and not cursor.startswith(INDEX_CURSOR_PREFIX):
+        # Continuing a listing that started against the live API
+        return None
+    return get_fresh_index()
+
+def live_cursor(cursor):
+    """Drop index cursors when a listing has to fall back to the live API."""
+    if cursor and cursor.startswith(INDEX_CURSOR_PREFIX):
+        return None
+    return cursor
+
+def list_index_page(fetch, page_size=10, cursor=None, friendly_types=False):
+    """Like list_files_page, but for rows from the metadata index.
+
+    fetch(limit, offset) returns the indexed items of the listing.
+    """
+    limit = page_size if page_size and page_size > 0 else MAX_LIST_RESULTS
+    limit = min(limit, MAX_LIST_RESULTS)
+    offset = int(cursor[len(INDEX_CURSOR_PREFIX):]) if cursor else 0
+    items = fetch(limit + 1, offset)
+    next_cursor = f"{INDEX_CURSOR_PREFIX}{offset + limit}" if len(items) > limit else None
+    items = items[:limit]
+    entries = "".join(format_file_entry(idx, item, friendly_types) for idx, item in enumerate(items, 1))
+    return entries, len(items), next_cursor
+
+def format_continuation(next_cursor):
+    if not next_cursor:
+        return ""
+    return f"More files available. Call again with cursor='{next_cursor}' to continue.\n"
 
 # Define schemas for each tool
 class ListFilesInput(BaseModel):
     page_size: int = Field(default=10, description="Maximum number of files to return")
+    cursor: Optional[str] = Field(None, description="Cursor from a previous call to continue listing")
     
 class ListFolderFilesInput(BaseModel):
     folder_id: str = Field(..., description="The ID of the folder to list files from")
     page_size: int = Field(default=10, description="Maximum number of files to return")
+    cursor: Optional[str] = Field(None, description="Cursor from a previous call to continue listing")
 
 class SearchFilesInput(BaseModel):
     query: str = Field(..., description="Search query. Can include file name, file type('document', 'doc', 'docs' for word document files, 'spreadsheet', 'sheet', 'sheets' for excel or spreadsheet files, 'presentation', 'slides' for powerpoint files, 'pdf' for pdf files, 'folder', 'directory' for folders or directories), or content keywords")
     page_size: int = Field(default=10, description="Maximum number of files to return")
+    cursor: Optional[str] = Field(None, description="Cursor from a previous call to continue the search")
 
 class GetFileMetadataInput(BaseModel):
     file_id: str = Field(..., description="The ID of the file to get metadata for")
@@ -66,56 +164,22 @@ class GetFileMetadataInput(BaseModel):
 # Define the tools
 class ListAllFilesTool(BaseTool):
     name: str = "list_all_files"
-    description: str = "Lists all files in Google Drive. Use when you need to get an overview of all files."
+    description: str = "Lists all files in Google Drive. Use when you need to get an overview of all files. Returns a cursor to continue when there are more files."
     args_schema: type[ListFilesInput] = ListFilesInput
     
-    def _run(self, page_size: int = 10) -> str:
+    def _run(self, page_size: int = 10, cursor: Optional[str] = None) -> str:
         """Lists all files in Google Drive."""
         try:
             service = get_drive_service()
-            results = service.files().list(
-                pageSize=page_size,
-                fields="nextPageToken, files(id, name, mimeType, createdTime, modifiedTime, size, owners, parents)"
-            ).execute()
-            items = results.get('files', [])
+            entries, count, next_cursor = list_files_page(service, page_size=page_size, cursor=cursor)
             
-            if not items:
+            if not count:
                 return "No files found in Google Drive."
             
-            files_info = []
-            for item in items:
-                file_type = item.get('mimeType', 'Unknown type')
-                modified_time = item.get('modifiedTime', 'Unknown')
-                if modified_time != 'Unknown':
-                    # Convert to a more readable format
-                    modified_time = datetime.datetime.fromisoformat(modified_time.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
-                
-                owner = "Unknown"
-                if 'owners' in item and item['owners']:
-                    owner = item['owners'][0].get('displayName', 'Unknown')
-                
-                size = item.get('size', 'Unknown')
-                if size != 'Unknown':
-                    # Convert size to a readable format
-                    size = f"{int(size) / 1024:.2f} KB" if int(size) < 1024 * 1024 else f"{int(size) / (1024 * 1024):.2f} MB"
-                
-                files_info.append({
-                    'id': item['id'],
-                    'name': item['name'],
-                    'type': file_type,
-                    'modified': modified_time,
-                    'owner': owner,
-                    'size': size
-                })
-            
             # Format the output
             output = "Files in Google Drive:\n\n"
-            for idx, file in enumerate(files_info, 1):
-                output += f"{idx}. {file['name']} ({file['type']})\n"
-                output += f"   ID: {file['id']}\n"
-                output += f"   Modified: {file['modified']}\n"
-                output += f"   Owner: {file['owner']}\n"
-                output += f"   Size: {file['size']}\n\n"
+            output += entries
+            output += format_continuation(next_cursor)
             
             return output
         
@@ -124,68 +188,50 @@ class ListAllFilesTool(BaseTool):
 
 class ListFolderFilesTool(BaseTool):
     name: str = "list_folder_files"
-    description: str = "Lists files in a specific folder in Google Drive. Use when you need to explore the contents of a particular folder."
+    description: str = "Lists files in a specific folder in Google Drive. Use when you need to explore the contents of a particular folder. Returns a cursor to continue when there are more files."
     args_schema: type[ListFolderFilesInput] = ListFolderFilesInput
     
-    def _run(self, folder_id: str, page_size: int = 10) -> str:
+    def _run(self, folder_id: str, page_size: int = 10, cursor: Optional[str] = None) -> str:
         """Lists files in a specific folder in Google Drive."""
         try:
-            service = get_drive_service()
-            query = f"'{folder_id}' in parents"
-            results = service.files().list(
-                q=query,
-                pageSize=page_size,
-                fields="nextPageToken, files(id, name, mimeType, createdTime, modifiedTime, size, owners)"
-            ).execute()
-            items = results.get('files', [])
-            
-            if not items:
-                # First verify that the folder exists
-                try:
-                    folder = service.files().get(fileId=folder_id).execute()
+            index = index_for_cursor(cursor)
+            folder = index.get(folder_id) if index is not None else None
+            if folder is not None:
+                # Answer from the local metadata index
+                entries, count, next_cursor = list_index_page(
+                    lambda limit, offset: index.list_folder(folder_id, limit, offset),
+                    page_size=page_size, cursor=cursor
+                )
+                if not count:
                     return f"No files found in folder '{folder['name']}'."
-                except:
-                    return f"Folder with ID '{folder_id}' not found or inaccessible."
-            
-            files_info = []
-            for item in items:
-                file_type = item.get('mimeType', 'Unknown type')
-                modified_time = item.get('modifiedTime', 'Unknown')
-                if modified_time != 'Unknown':
-                    modified_time = datetime.datetime.fromisoformat(modified_time.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
-                
-                owner = "Unknown"
-                if 'owners' in item and item['owners']:
-                    owner = item['owners'][0].get('displayName', 'Unknown')
+                folder_name = folder.get('name', 'Unknown folder')
+            else:
+                # Folders the index does not know are listed live
+                service = get_drive_service()
+                query = f"'{folder_id}' in parents"
+                entries, count, next_cursor = list_files_page(
+                    service, q=query, page_size=page_size, cursor=live_cursor(cursor)
+                )
                 
-                size = item.get('size', 'Unknown')
-                if size != 'Unknown':
-                    size = f"{int(size) / 1024:.2f} KB" if int(size) < 1024 * 1024 else f"{int(size) / (1024 * 1024):.2f} MB"
+                if not count:
+                    # First verify that the folder exists
+                    try:
+                        folder = service.files().get(fileId=folder_id).execute()
+                        return f"No files found in folder '{folder['name']}'."
+                    except:
+                        return f"Folder with ID '{folder_id}' not found or inaccessible."
                 
-                files_info.append({
-                    'id': item['id'],
-                    'name': item['name'],
-                    'type': file_type,
-                    'modified': modified_time,
-                    'owner': owner,
-                    'size': size
-                })
-            
-            # Get folder name for better output
-            try:
-                folder = service.files().get(fileId=folder_id, fields="name").execute()
-                folder_name = folder.get('name', 'Unknown folder')
-            except:
-                folder_name = "Folder"
+                # Get folder name for better output
+                try:
+                    folder = service.files().get(fileId=folder_id, fields="name").execute()
+                    folder_name = folder.get('name', 'Unknown folder')
+                except:
+                    folder_name = "Folder"
             
             # Format the output
             output = f"Files in '{folder_name}' (ID: {folder_id}):\n\n"
-            for idx, file in enumerate(files_info, 1):
-                output += f"{idx}. {file['name']} ({file['type']})\n"
-                output += f"   ID: {file['id']}\n"
-                output += f"   Modified: {file['modified']}\n"
-                output += f"   Owner: {file['owner']}\n"
-                output += f"   Size: {file['size']}\n\n"
+            output += entries
+            output += format_continuation(next_cursor)
             
             return output
         
@@ -197,87 +243,33 @@ class SearchFilesTool(BaseTool):
     description: str = "Searches for specific files in Google Drive Searches for files by name, file type(pdf, document, docs, sheet, folder etc..), or content. Use when looking for specific files."
     args_schema: type[SearchFilesInput] = SearchFilesInput
     
-    def _run(self, query: str, page_size: int = 10) -> str:
+    def _run(self, query: str, page_size: int = 10, cursor: Optional[str] = None) -> str:
         """Searches for files in Google Drive by name, file type(or file extension), or content keywords."""
         try:
-            service = get_drive_service()
-            
-            # Handle common file type searches more intuitively
-            if query.lower() in ['document', 'doc', 'docs', 'type:document', 'type:doc', 'type:docs']:
-                search_query = "mimeType = 'application/vnd.google-apps.document'"
-            elif query.lower() in ['spreadsheet', 'sheet', 'sheets', 'type:spreadsheet', 'type:sheet', 'type:sheets']:
-                search_query = "mimeType = 'application/vnd.google-apps.spreadsheet'"
-            elif query.lower() in ['presentation', 'slides', 'type:presentation', 'type:slides']:
-                search_query = "mimeType = 'application/vnd.google-apps.presentation'"
-            elif query.lower() in ['pdf', 'type:pdf']:
-                search_query = "mimeType = 'application/pdf'"
-            elif query.lower() in ['folder', 'directory', 'type:folder', 'type:directory']:
-                search_query = "mimeType = 'application/vnd.google-apps.folder'"
+            mime_type = query_mime_type(query)
+            # File type searches can be answered locally; content searches need
+            # Drive's fullText index
+            index = index_for_cursor(cursor) if mime_type else None
+            if index is not None:
+                entries, count, next_cursor = list_index_page(
+                    lambda limit, offset: index.find_by_mime_type(mime_type, limit, offset),
+                    page_size=page_size, cursor=cursor, friendly_types=True
+                )
             else:
-                words = query.split()
-                name_terms = [f"name contains '{word}'" for word in words]
-                content_terms = [f"fullText contains '{word}'" for word in words]
-                
-                name_query = " or ".join(name_terms)
-                content_query = " or ".join(content_terms)
-                search_query = f"({name_query}) and ({content_query})"
-            
-            results = service.files().list(
-                q=search_query,
-                pageSize=page_size,
-                fields="nextPageToken, files(id, name, mimeType, createdTime, modifiedTime, size, owners, parents)"
-            ).execute()
+                service = get_drive_service()
+                search_query = build_search_query(query)
+                entries, count, next_cursor = list_files_page(
+                    service, q=search_query, page_size=page_size, cursor=live_cursor(cursor),
+                    friendly_types=True
+                )
             
-            items = results.get('files', [])
-            
-            if not items:
+            if not count:
                 return f"No files found matching '{query}'."
             
-            files_info = []
-            for item in items:
-                file_type = item.get('mimeType', 'Unknown type')
-                # Convert Google Drive mime types to more readable formats
-                if file_type == 'application/vnd.google-apps.document':
-                    file_type = 'Google Doc'
-                elif file_type == 'application/vnd.google-apps.spreadsheet':
-                    file_type = 'Google Sheet'
-                elif file_type == 'application/vnd.google-apps.presentation':
-                    file_type = 'Google Slides'
-                elif file_type == 'application/vnd.google-apps.folder':
-                    file_type = 'Folder'
-                    
-                modified_time = item.get('modifiedTime', 'Unknown')
-                if modified_time != 'Unknown':
-                    modified_time = datetime.datetime.fromisoformat(modified_time.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
-                
-                owner = "Unknown"
-                if 'owners' in item and item['owners']:
-                    owner = item['owners'][0].get('displayName', 'Unknown')
-                
-                size = item.get('size', 'Unknown')
-                if size != 'Unknown':
-                    size = f"{int(size) / 1024:.2f} KB" if int(size) < 1024 * 1024 else f"{int(size) / (1024 * 1024):.2f} MB"
-                else:
-                    if file_type == 'Folder':
-                        size = 'N/A'
-                
-                files_info.append({
-                    'id': item['id'],
-                    'name': item['name'],
-                    'type': file_type,
-                    'modified': modified_time,
-                    'owner': owner,
-                    'size': size
-                })
-            
             # Format the output
             output = f"Search results for '{query}':\n\n"
-            for idx, file in enumerate(files_info, 1):
-                output += f"{idx}. {file['name']} ({file['type']})\n"
-                output += f"   ID: {file['id']}\n"
-                output += f"   Modified: {file['modified']}\n"
-                output += f"   Owner: {file['owner']}\n"
-                output += f"   Size: {file['size']}\n\n"
+            output += entries
+            output += format_continuation(next_cursor)
             
             return output
         
@@ -292,14 +284,18 @@ class GetFileMetadataTool(BaseTool):
     def _run(self, file_id: str) -> str:
         """Gets detailed metadata for a file."""
         try:
-            service = get_drive_service()
-            # metadata
-            file = service.files().get(
-                fileId=file_id,
-                fields="id, name, mimeType, description, createdTime, modifiedTime, modifiedByMeTime, viewedByMeTime, "
-                       "size, version, webViewLink, iconLink, thumbnailLink, owners, sharingUser, shared, " 
-                       "lastModifyingUser, capabilities, permissions, starred, trashed"
-            ).execute()
+            # Served from the local metadata index when it is fresh and has the file
+            index = get_fresh_index()
+            file = index.get(file_id) if index is not None else None
+            if file is None:
+                service = get_drive_service()
+                # metadata
+                file = service.files().get(
+                    fileId=file_id,
+                    fields="id, name, mimeType, description, createdTime, modifiedTime, modifiedByMeTime, viewedByMeTime, "
+                           "size, version, webViewLink, iconLink, thumbnailLink, owners, sharingUser, shared, " 
+                           "lastModifyingUser, capabilities, permissions, starred, trashed"
+                ).execute()
             
             if not file:
                 return f"No file found with ID '{file_id}'."
@@ -6,15 +6,12 @@ This extension adds document reading and analysis capabilities to the Google Dri
 import os
 import re
 import io
+import time
 import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel, Field
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-import pickle
 import datetime
 
 # Document processing imports
@@ -42,51 +39,53 @@ from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.memory import ConversationBufferMemory
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.chains.summarize import load_summarize_chain
 from langchain.docstore.document import Document as LangchainDocument
 from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.chains import RetrievalQA
 
-# Define the scopes required for Google Drive access
-SCOPES = ["https://www.googleapis.com/auth/drive.readonly",
-  "https://www.googleapis.com/auth/spreadsheets"]
+from app.tools.drive_service import get_drive_service
+from app.tools.drive_download import download_media, open_range_reader, PDF_RANGE_THRESHOLD
+from app.tools.content_cache import content_cache, disk_content_cache, content_version, disk_version
+from app.tools.drive_service import iter_files
+from app.tools.fulltext_index import get_fulltext_index
+from app.tools.metadata_index import get_metadata_index
+from app.tools.file_browsing_tools import format_file_entry, build_search_query
+from app.tools.information_extractor import extract, parse_info_types
+from app.tools.parsed_document import ParsedDocument, parse_result
+from app.tools.summarizer import get_summarization_engine, SUMMARY_TREE_PREBUILD, SUMMARY_TREE_MIN_CHARS
+from app.tools.vector_store import vector_index_store, index_version, get_embeddings, get_corpus_index, EMBEDDING_MODEL
+
+# Metadata fields needed to read a file and key the content caches
+FILE_METADATA_FIELDS = "name, mimeType, modifiedTime, version, size, md5Checksum"
+# Drive accepts at most 100 calls per batch request
+DRIVE_BATCH_LIMIT = 100
+# Concurrent downloads of read_files, shared by all calls
+READ_FILES_MAX_WORKERS = int(os.getenv("READ_FILES_MAX_WORKERS", "8"))
+# Chunking used for question answering
+QA_CHUNK_SIZE = 1000
+QA_CHUNK_OVERLAP = 200
+# Documents searched by one answer_corpus_question call unless the agent asks for
+# a different number, and the most it may ask for
+CORPUS_DEFAULT_FILES = 500
+CORPUS_MAX_FILES = int(os.getenv("CORPUS_MAX_FILES", "5000"))
+# Most documents read from a folder when indexing it for search_document_contents
+FULLTEXT_FOLDER_LIMIT = int(os.getenv("FULLTEXT_FOLDER_LIMIT", "200"))
 
 # Download NLTK resources
 try:
     nltk.data.find('tokenizers/punkt')
 except LookupError:
     nltk.download('punkt')
+try:
+    nltk.data.find('tokenizers/punkt_tab')
+except LookupError:
+    nltk.download('punkt_tab')
 try:
     nltk.data.find('corpora/stopwords')
 except LookupError:
     nltk.download('stopwords')
 
-def get_drive_service():
-    """Authenticate and return the Google Drive service."""
-    creds = None
-    # Load credentials from token.pickle if it exists
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-    
-    # If credentials don't exist or are invalid, get new ones
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Save the credentials for the next run
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-    
-    # Build the Drive service
-    service = build('drive', 'v3', credentials=creds)
-    return service
-
 # Define schemas for each tool
 class ReadFileInput(BaseModel):
     file_id: str = Field(..., description="The ID of the file to read")
@@ -106,58 +105,250 @@ class SummarizeDocumentInput(BaseModel):
     file_id: str = Field(..., description="The ID of the file to summarize")
     summary_length: str = Field(default="medium", 
                                description="Length of summary: 'short', 'medium', or 'long'")
+    section: Optional[str] = Field(None, description="Optional section number or title word to summarize instead of the whole document")
 
 class SearchInDocumentInput(BaseModel):
     file_id: str = Field(..., description="The ID of the file to search in")
     query: str = Field(..., description="The keyword or phrase to search for")
     case_sensitive: bool = Field(default=False, description="Whether the search should be case-sensitive")
 
+class ReadFilesInput(BaseModel):
+    file_ids: List[str] = Field(..., description="The IDs of the files to read")
+    max_pages: int = Field(default=5, description="Maximum number of pages to read per file (for PDFs)")
+
+class AnswerCorpusQuestionInput(BaseModel):
+    question: str = Field(..., description="The question to answer from the documents")
+    folder_id: Optional[str] = Field(None, description="ID of a folder whose documents should be searched")
+    query: Optional[str] = Field(None, description="A search_files style query selecting the documents to search, used when no folder_id is given")
+    max_files: int = Field(default=CORPUS_DEFAULT_FILES, description="Maximum number of documents to include")
+    k: int = Field(default=5, description="Number of passages to retrieve across all documents")
+
+class SearchDocumentContentsInput(BaseModel):
+    query: str = Field(..., description="Keywords to search for across documents; wrap in double quotes to search for an exact phrase")
+    page_size: int = Field(default=10, description="Maximum number of documents to return")
+    folder_id: Optional[str] = Field(None, description="Optional folder ID whose documents are read and indexed before searching")
+
 class AnswerQuestionInput(BaseModel):
     file_id: str = Field(..., description="The ID of the file to query")
     question: str = Field(..., description="The question to answer based on the file contents")
 
+def build_qa_documents(result):
+    """Split a read_file result into the chunks embedded for question answering."""
+    # Chunk along paragraph and sentence boundaries, keeping each chunk's offset
+    content = result['content']
+    spans = parse_result(result).chunk_spans(QA_CHUNK_SIZE, QA_CHUNK_OVERLAP)
+    
+    # Convert to LangChain documents with metadata
+    return [
+        LangchainDocument(
+            page_content=content[start:end],
+            metadata={"source": result['file_name'], "file_id": result['file_id'], "start": start}
+        ) for start, end in spans
+    ]
+
+# Bumped when chunking changes, so indexes of the old chunks are rebuilt
+QA_INDEX_PARAMS = f"{EMBEDDING_MODEL}|{QA_CHUNK_SIZE}|{QA_CHUNK_OVERLAP}|spans-v2"
+
+def get_qa_index(result):
+    """Return the FAISS index of a read_file result, building it once per file version."""
+    return vector_index_store.get_or_build(
+        result['file_id'], index_version(result), lambda: build_qa_documents(result),
+        params=QA_INDEX_PARAMS
+    )
+
+def schedule_fulltext_indexing(result):
+    """Add a freshly read document to the local full-text index in the background."""
+    index = get_fulltext_index()
+    if index is not None:
+        index.schedule(result)
+
+def schedule_summary_tree(result):
+    """Start building the summary tree of a large document when prebuilding is enabled."""
+    if SUMMARY_TREE_PREBUILD and len(result.get('content') or '') >= SUMMARY_TREE_MIN_CHARS:
+        get_summarization_engine().schedule_tree(result)
+
+_read_pool = None
+_read_pool_lock = threading.Lock()
+
+def get_read_pool():
+    """Return the process-wide download pool of read_files.
+
+    Its threads live as long as the process, so each keeps its own Drive service
+    and warm connections from one read_files call to the next.
+    """
+    global _read_pool
+    if _read_pool is None:
+        with _read_pool_lock:
+            if _read_pool is None:
+                _read_pool = ThreadPoolExecutor(
+                    max_workers=max(1, READ_FILES_MAX_WORKERS), thread_name_prefix="read-files")
+    return _read_pool
+
 class FileReader:
     """Class to handle reading different file types from Google Drive."""
     
     def __init__(self, service):
         self.service = service
+        self.last_download_stats = None
         
     def get_file_metadata(self, file_id):
         """Get metadata for a file."""
-        return self.service.files().get(fileId=file_id, fields="name, mimeType").execute()
+        return self.service.files().get(fileId=file_id, fields=FILE_METADATA_FIELDS).execute()
+
+    def get_files_metadata(self, file_ids):
+        """Get metadata for many files with batched HTTP requests.
+
+        Returns a dict mapping each file ID to its metadata or to the exception
+        raised for it.
+        """
+        results = {}
+
+        def callback(request_id, response, exception):
+            results[request_id] = exception if exception is not None else response
+
+        for i in range(0, len(file_ids), DRIVE_BATCH_LIMIT):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for file_id in file_ids[i:i + DRIVE_BATCH_LIMIT]:
+                batch.add(
+                    self.service.files().get(fileId=file_id, fields=FILE_METADATA_FIELDS),
+                    request_id=file_id
+                )
+            batch.execute()
+        return results
     
     def download_file(self, file_id):
-        """Download a file's content."""
+        """Download a file's content into a spooled temporary file."""
         request = self.service.files().get_media(fileId=file_id)
-        file_content = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_content, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        file_content.seek(0)
+        file_content, self.last_download_stats = download_media(request, label=file_id)
         return file_content
     
     def export_google_doc(self, file_id, mime_type='text/plain'):
         """Export a Google Doc to the specified format."""
         request = self.service.files().export_media(fileId=file_id, mimeType=mime_type)
-        file_content = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_content, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        file_content.seek(0)
+        file_content, self.last_download_stats = download_media(request, label=f"{file_id} as {mime_type}")
         return file_content
 
-    def read_file(self, file_id, max_pages=5):
+    def read_file(self, file_id, max_pages=5, use_cache=True, file_metadata=None):
+        """Read a file's content, using the shared content cache when possible."""
+        if file_metadata is None:
+            try:
+                file_metadata = self.get_file_metadata(file_id)
+            except Exception as e:
+                return {
+                    'content': None,
+                    'file_name': 'Unknown',
+                    'mime_type': 'Unknown',
+                    'status': 'error',
+                    'error': str(e)
+                }
+
+        version = content_version(file_metadata)
+        stored_version = disk_version(file_metadata)
+        cache_key = (file_id, version)
+        variant = None
+        if file_metadata.get('mimeType') == 'application/pdf':
+            # PDFs are read up to max_pages, so each limit is its own entry
+            variant = max_pages
+            cache_key += (max_pages,)
+
+        if use_cache:
+            cached = content_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
+            # Fall back to the persistent cache before downloading
+            stored = disk_content_cache.get(file_id, stored_version, variant)
+            if stored is not None:
+                # Entries are keyed by content hash, so a rename or other
+                # metadata-only change still hits; report the current metadata
+                stored.update(
+                    file_id=file_id,
+                    version=version,
+                    checksum=file_metadata.get('md5Checksum'),
+                    file_name=file_metadata.get('name', stored.get('file_name')),
+                    mime_type=file_metadata.get('mimeType', stored.get('mime_type')),
+                    cache_key=cache_key,
+                )
+                content_cache.put(cache_key, stored)
+                schedule_fulltext_indexing(stored)
+                return dict(stored)
+
+        result = self._read_content(file_id, file_metadata, max_pages)
+        if result['status'] == 'success':
+            result['file_id'] = file_id
+            result['version'] = version
+            result['checksum'] = file_metadata.get('md5Checksum')
+            result['cache_key'] = cache_key
+            content_cache.put(cache_key, result)
+            disk_content_cache.put(
+                file_id, stored_version,
+                {k: v for k, v in result.items() if k != 'cache_key'},
+                variant
+            )
+            schedule_fulltext_indexing(result)
+            schedule_summary_tree(result)
+        return dict(result)
+
+    def read_files(self, file_ids, max_pages=5):
+        """Read many files: one batched metadata lookup, then concurrent downloads.
+
+        Returns the per-file results (in the order given) and aggregate timing.
+        """
+        start = time.monotonic()
+        file_ids = list(dict.fromkeys(file_ids))
+        if not file_ids:
+            return {'results': [], 'succeeded': 0, 'failed': 0,
+                    'metadata_seconds': 0.0, 'total_seconds': 0.0}
+
+        try:
+            metadata = self.get_files_metadata(file_ids)
+        except Exception as e:
+            metadata = {file_id: e for file_id in file_ids}
+        metadata_seconds = time.monotonic() - start
+
+        def read_one(file_id):
+            file_start = time.monotonic()
+            file_metadata = metadata.get(file_id)
+            if file_metadata is None or isinstance(file_metadata, Exception):
+                result = {
+                    'content': None,
+                    'file_name': 'Unknown',
+                    'mime_type': 'Unknown',
+                    'status': 'error',
+                    'error': str(file_metadata) if file_metadata else "No metadata returned"
+                }
+            else:
+                # Each pool thread keeps its own Drive service across calls
+                reader = FileReader(get_drive_service())
+                result = reader.read_file(file_id, max_pages, file_metadata=file_metadata)
+            result['file_id'] = file_id
+            result['seconds'] = time.monotonic() - file_start
+            return result
+
+        if len(file_ids) == 1:
+            results = [read_one(file_ids[0])]
+        else:
+            results = list(get_read_pool().map(read_one, file_ids))
+
+        succeeded = sum(1 for r in results if r['status'] == 'success')
+        return {
+            'results': results,
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'metadata_seconds': metadata_seconds,
+            'total_seconds': time.monotonic() - start,
+        }
+
+    def _read_content(self, file_id, file_metadata, max_pages=5):
         """Read a file's content based on its type."""
         try:
-            file_metadata = self.get_file_metadata(file_id)
             file_name = file_metadata.get('name', 'Unknown')
             mime_type = file_metadata.get('mimeType', 'Unknown')
             
             # Handle Google Docs
             if mime_type == 'application/vnd.google-apps.document':
-                content = self.export_google_doc(file_id).read().decode('utf-8')
+                with self.export_google_doc(file_id) as file_content:
+                    content = file_content.read().decode('utf-8')
                 return {
                     'content': content,
                     'file_name': file_name,
@@ -167,7 +358,8 @@ class FileReader:
             
             # Handle Google Sheets
             elif mime_type == 'application/vnd.google-apps.spreadsheet':
-                content = self.export_google_doc(file_id, mime_type='text/csv').read().decode('utf-8')
+                with self.export_google_doc(file_id, mime_type='text/csv') as file_content:
+                    content = file_content.read().decode('utf-8')
                 return {
                     'content': content,
                     'file_name': file_name,
@@ -177,7 +369,8 @@ class FileReader:
                 
             # Handle Google Slides
             elif mime_type == 'application/vnd.google-apps.presentation':
-                content = self.export_google_doc(file_id, mime_type='text/plain').read().decode('utf-8')
+                with self.export_google_doc(file_id, mime_type='text/plain') as file_content:
+                    content = file_content.read().decode('utf-8')
                 return {
                     'content': content,
                     'file_name': file_name,
@@ -187,14 +380,22 @@ class FileReader:
                 
             # Handle PDFs
             elif mime_type == 'application/pdf':
-                file_content = self.download_file(file_id)
-                pdf_reader = PyPDF2.PdfReader(file_content)
-                content = ""
-                for i in range(min(len(pdf_reader.pages), max_pages)):
-                    content += pdf_reader.pages[i].extract_text() + "\n\n"
-                
-                if len(pdf_reader.pages) > max_pages:
-                    content += f"\n[Note: Only showing first {max_pages} of {len(pdf_reader.pages)} pages]"
+                size = int(file_metadata.get('size') or 0)
+                if size >= PDF_RANGE_THRESHOLD:
+                    # Large PDFs are fetched lazily, so only the pages read are downloaded
+                    file_content = open_range_reader(self.service, file_id, size)
+                else:
+                    file_content = self.download_file(file_id)
+                try:
+                    pdf_reader = PyPDF2.PdfReader(file_content)
+                    content = ""
+                    for i in range(min(len(pdf_reader.pages), max_pages)):
+                        content += pdf_reader.pages[i].extract_text() + "\n\n"
+                    
+                    if len(pdf_reader.pages) > max_pages:
+                        content += f"\n[Note: Only showing first {max_pages} of {len(pdf_reader.pages)} pages]"
+                finally:
+                    file_content.close()
                 
                 return {
                     'content': content,
@@ -207,8 +408,8 @@ class FileReader:
                 
             # Handle DOCX
             elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-                file_content = self.download_file(file_id)
-                doc = Document(file_content)
+                with self.download_file(file_id) as file_content:
+                    doc = Document(file_content)
                 content = "\n".join([para.text for para in doc.paragraphs])
                 return {
                     'content': content,
@@ -219,8 +420,8 @@ class FileReader:
                 
             # Handle Plain Text
             elif mime_type in ['text/plain', 'text/markdown', 'text/csv', 'application/json']:
-                file_content = self.download_file(file_id)
-                content = file_content.read().decode('utf-8')
+                with self.download_file(file_id) as file_content:
+                    content = file_content.read().decode('utf-8')
                 return {
                     'content': content,
                     'file_name': file_name,
@@ -230,8 +431,8 @@ class FileReader:
                 
             # Handle HTML
             elif mime_type in ['text/html']:
-                file_content = self.download_file(file_id)
-                html_content = file_content.read().decode('utf-8')
+                with self.download_file(file_id) as file_content:
+                    html_content = file_content.read().decode('utf-8')
                 h = html2text.HTML2Text()
                 h.ignore_links = False
                 content = h.handle(html_content)
@@ -266,69 +467,24 @@ class DocumentParser:
     
     @staticmethod
     def parse_document(content, level='sections'):
-        """Parse a document into the specified level of granularity."""
-        if not content:
-            return []
-            
-        if level == 'sections':
-            # Define section patterns based on headings
-            section_patterns = [
-                # Markdown/HTML headings
-                r'(?:^|\n)#{1,6}\s+(.+?)(?=\n#{1,6}\s+|\Z)',
-                # Numbered headings
-                r'(?:^|\n)(?:\d+\.)+\s+(.+?)(?=\n(?:\d+\.)+\s+|\Z)',
-                # Uppercase headings
-                r'(?:^|\n)([A-Z][A-Z\s]+[A-Z])(?:\n|\Z)',
-                # Lines ending with colon (potential section headers)
-                r'(?:^|\n)([^:\n]+):(?:\n|\Z)'
-            ]
-            
-            sections = []
-            remaining_content = content
-            
-            for pattern in section_patterns:
-                matches = re.finditer(pattern, content, re.MULTILINE | re.DOTALL)
-                for match in matches:
-                    section_title = match.group(1).strip()
-                    section_content = match.group(0).strip()
-                    sections.append({
-                        'title': section_title,
-                        'content': section_content
-                    })
-                    # Remove matched content from remaining_content
-                    remaining_content = remaining_content.replace(match.group(0), '', 1)
-            
-            # If no sections were found or there's remaining content, create default sections
-            if not sections or remaining_content.strip():
-                # Try to split by double newlines
-                parts = [p for p in remaining_content.split('\n\n') if p.strip()]
-                if len(parts) > 1:
-                    for i, part in enumerate(parts):
-                        sections.append({
-                            'title': f"Section {i+1}",
-                            'content': part.strip()
-                        })
-                else:
-                    sections.append({
-                        'title': "Document Content",
-                        'content': remaining_content.strip()
-                    })
-            
-            return sections
-            
-        elif level == 'paragraphs':
-            # Split by double newlines and filter out empty paragraphs
-            paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
-            return [{'paragraph': i+1, 'content': p} for i, p in enumerate(paragraphs)]
-            
-        elif level == 'sentences':
-            # Use NLTK to tokenize into sentences
-            sentences = sent_tokenize(content)
-            return [{'sentence': i+1, 'content': s.strip()} for i, s in enumerate(sentences) if s.strip()]
-            
-        else:
-            # Default to returning the raw content
-            return [{'content': content}]
+        """Parse a document into the specified level of granularity.
+        
+        Returns a ParsedDocument whose sections, paragraphs and sentences are
+        offsets into content; the requested level is computed right away and
+        the others on first use.
+        """
+        document = ParsedDocument(content or "")
+        if level in ('sections', 'paragraphs', 'sentences'):
+            getattr(document, level)
+        return document
+    
+    @staticmethod
+    def parse_result(result, level='sections'):
+        """Like parse_document for a read_file result, reusing its cached sentence offsets."""
+        document = parse_result(result)
+        if level in ('sections', 'paragraphs', 'sentences'):
+            getattr(document, level)
+        return document
 
 class InformationExtractor:
     """Class to extract various types of information from text."""
@@ -336,116 +492,45 @@ class InformationExtractor:
     @staticmethod
     def extract_dates(text):
         """Extract dates from text."""
-        # Common date patterns
-        date_patterns = [
-            r'\b(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}\b',
-            r'\b\d{1,2}(?:st|nd|rd|th)?\s+(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?),?\s+\d{4}\b',
-            r'\b\d{1,2}/\d{1,2}/\d{2,4}\b',
-            r'\b\d{4}-\d{1,2}-\d{1,2}\b',
-            r'\b\d{1,2}-\d{1,2}-\d{4}\b',
-            r'\b(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\s+\d{1,2}(?:st|nd|rd|th)?\b'
-        ]
-        
-        dates = []
-        for pattern in date_patterns:
-            dates.extend(re.findall(pattern, text, re.IGNORECASE))
-        
-        return list(set(dates))  # Remove duplicates
+        return [item.value for item in extract(text, ('dates',))['dates']]
     
     @staticmethod
     def extract_names(text):
         """Extract potential person names from text."""
-        # Simple pattern for potential names (2-3 capitalized words)
-        name_patterns = [
-            r'\b[A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?\b'
-        ]
-        
-        names = []
-        for pattern in name_patterns:
-            names.extend(re.findall(pattern, text))
-        
-        # Filter out common false positives
-        false_positives = {'United States', 'New York', 'Los Angeles', 'San Francisco', 
-                         'Hong Kong', 'United Kingdom', 'Monday Morning', 'Tuesday Evening',
-                         'Wednesday Afternoon', 'Thursday Night', 'Friday Morning', 
-                         'Saturday Evening', 'Sunday Afternoon'}
-        
-        filtered_names = [name for name in names if name not in false_positives]
-        return list(set(filtered_names))  # Remove duplicates
+        return [item.value for item in extract(text, ('names',))['names']]
     
     @staticmethod
     def extract_emails(text):
         """Extract email addresses from text."""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        return list(set(re.findall(email_pattern, text)))
+        return [item.value for item in extract(text, ('emails',))['emails']]
     
     @staticmethod
     def extract_urls(text):
         """Extract URLs from text."""
-        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/\w\.-]*\b'
-        return list(set(re.findall(url_pattern, text)))
+        return [item.value for item in extract(text, ('urls',))['urls']]
     
     @staticmethod
     def extract_headers(text):
         """Extract potential headers from text."""
-        # Patterns for different header styles
-        header_patterns = [
-            # Markdown headers
-            r'(?:^|\n)#{1,6}\s+(.+?)(?=\n|$)',
-            # Uppercase "headers"
-            r'(?:^|\n)([A-Z][A-Z\s]+[A-Z])(?:\n|$)',
-            # Numbered headers
-            r'(?:^|\n)(?:\d+\.)+\s+(.+?)(?=\n|$)',
-            # Underlined headers with = or -
-            r'(?:^|\n)(.+)\n[=]{2,}(?:\n|$)',
-            r'(?:^|\n)(.+)\n[-]{2,}(?:\n|$)'
-        ]
-        
-        headers = []
-        for pattern in header_patterns:
-            matches = re.finditer(pattern, text, re.MULTILINE)
-            for match in matches:
-                if len(match.groups()) > 0:
-                    headers.append(match.group(1).strip())
-                else:
-                    headers.append(match.group(0).strip())
-        
-        return list(set(headers))
+        return [item.value for item in extract(text, ('headers',))['headers']]
     
     @staticmethod
     def extract_information(text, info_types='all'):
-        """Extract specified types of information from text."""
+        """Extract specified types of information from text.
+        
+        All requested types are found in one scan of the text. Each type maps
+        to de-duplicated Extraction entries (value, positions, count) in order
+        of first occurrence.
+        """
         if not text:
             return {}
-            
-        requested_types = [t.strip().lower() for t in info_types.split(',')]
-        extract_all = 'all' in requested_types
-        
-        result = {}
-        
-        if extract_all or 'dates' in requested_types:
-            result['dates'] = InformationExtractor.extract_dates(text)
-        
-        if extract_all or 'names' in requested_types:
-            result['names'] = InformationExtractor.extract_names(text)
-        
-        if extract_all or 'emails' in requested_types:
-            result['emails'] = InformationExtractor.extract_emails(text)
-        
-        if extract_all or 'urls' in requested_types:
-            result['urls'] = InformationExtractor.extract_urls(text)
-        
-        if extract_all or 'headers' in requested_types:
-            result['headers'] = InformationExtractor.extract_headers(text)
-        
-        return result
+        return extract(text, parse_info_types(info_types))
 
 # Tools Implementation
 class ReadFileTool(BaseTool):
     name: str = "read_file"
     description: str = "Reads the content of text-based files in Google Drive (Google Docs, TXT, PDFs, etc.). Use this to access the content of a specific file."
     args_schema: type[ReadFileInput] = ReadFileInput
-    file_cache: Dict[str, Any] = Field(default_factory=dict)
     
     def _run(self, file_id: str, max_pages: int = 5) -> str:
         """Reads the content of a file in Google Drive."""
@@ -474,81 +559,101 @@ class ReadFileTool(BaseTool):
             if len(content) > preview_length:
                 output += "...\n[Content truncated for preview]"
                 
-            # Store the full content in the tool's memory for other tools to use
-            self.file_cache[file_id] = {
-                'file_name': file_name,
-                'mime_type': mime_type,
-                'content': content,
-                'access_time': datetime.datetime.now()
-            }
-            
             return output
         
         except Exception as e:
             return f"Error reading file: {str(e)}"
 
+class ReadFilesTool(BaseTool):
+    name: str = "read_files"
+    description: str = "Reads the content of several files in Google Drive at once. Use this instead of calling read_file repeatedly when you need many files, e.g. to compare or summarize a set of documents."
+    args_schema: type[ReadFilesInput] = ReadFilesInput
+    
+    def _run(self, file_ids: List[str], max_pages: int = 5) -> str:
+        """Reads the content of several files in Google Drive."""
+        try:
+            service = get_drive_service()
+            file_reader = FileReader(service)
+            batch = file_reader.read_files(file_ids, max_pages)
+            
+            output = f"Read {batch['succeeded']} of {len(batch['results'])} file(s) "
+            output += f"in {batch['total_seconds']:.2f}s (metadata: {batch['metadata_seconds']:.2f}s).\n\n"
+            
+            for idx, result in enumerate(batch['results'], 1):
+                if result['status'] == 'error':
+                    output += f"{idx}. {result['file_id']}: Error reading file: {result['error']}\n\n"
+                    continue
+                
+                content = result['content']
+                output += f"{idx}. {result['file_name']} ({result['mime_type']})\n"
+                output += f"   ID: {result['file_id']}\n"
+                if 'pages' in result:
+                    output += f"   PDF document with {result['pages']} pages. Read {result['pages_read']} page(s).\n"
+                
+                # Keep previews short since many files share one response
+                preview_length = min(300, len(content))
+                output += f"   Content preview:\n{content[:preview_length]}"
+                if len(content) > preview_length:
+                    output += "...\n[Content truncated for preview]"
+                output += "\n\n"
+            
+            return output
+        
+        except Exception as e:
+            return f"Error reading files: {str(e)}"
+
 class ParseDocumentTool(BaseTool):
     name: str = "parse_document"
     description: str = "Parses a document into sections, paragraphs, or sentences for better analysis. Use this to break down document structure."
     args_schema: type[ParseDocumentInput] = ParseDocumentInput
-    file_cache: Dict[str, Any] = Field(default_factory=dict)
     
     def _run(self, file_id: str, parse_level: str = "sections") -> str:
         """Parses a document into the specified level of granularity."""
         try:
-            # Check if we have the file content cached
-            if hasattr(self, 'file_cache') and file_id in self.file_cache:
-                file_data = self.file_cache[file_id]
-                content = file_data['content']
-                file_name = file_data['file_name']
-            else:
-                # Read the file if not cached
-                service = get_drive_service()
-                file_reader = FileReader(service)
-                result = file_reader.read_file(file_id)
-                
-                if result['status'] == 'error':
-                    return f"Error reading file: {result['error']}"
-                
-                content = result['content']
-                file_name = result['file_name']
-                
-                # Cache the content for later use
-                self.file_cache[file_id] = {
-                    'file_name': result['file_name'],
-                    'mime_type': result['mime_type'],
-                    'content': content,
-                    'access_time': datetime.datetime.now()
-                }
+            # Read the file (served from the shared content cache when possible)
+            service = get_drive_service()
+            file_reader = FileReader(service)
+            result = file_reader.read_file(file_id)
+            
+            if result['status'] == 'error':
+                return f"Error reading file: {result['error']}"
+            
+            content = result['content']
+            file_name = result['file_name']
             
             # Parse the document
             parser = DocumentParser()
-            parsed_content = parser.parse_document(content, parse_level)
+            document = parser.parse_result(result, parse_level)
+            
+            def preview(span):
+                start, end = span
+                return content[start:start + 100] + "..." if end - start > 100 else content[start:end]
             
             # Format the output
             if parse_level == 'sections':
-                output = f"Parsed '{file_name}' into {len(parsed_content)} sections:\n\n"
-                for i, section in enumerate(parsed_content, 1):
-                    title = section['title']
-                    content_preview = section['content'][:100] + "..." if len(section['content']) > 100 else section['content']
-                    output += f"{i}. {title}\n   Preview: {content_preview}\n\n"
+                sections = document.sections
+                output = f"Parsed '{file_name}' into {len(sections)} sections:\n\n"
+                for i in range(len(sections)):
+                    title = document.section(i).title
+                    output += f"{i + 1}. {title}\n   Preview: {preview(sections[i])}\n\n"
             
             elif parse_level == 'paragraphs':
-                output = f"Parsed '{file_name}' into {len(parsed_content)} paragraphs:\n\n"
-                for i, para in enumerate(parsed_content[:10], 1):  # Show only first 10
-                    content_preview = para['content'][:100] + "..." if len(para['content']) > 100 else para['content']
-                    output += f"Paragraph {i}: {content_preview}\n\n"
+                paragraphs = document.paragraphs
+                output = f"Parsed '{file_name}' into {len(paragraphs)} paragraphs:\n\n"
+                for i in range(min(10, len(paragraphs))):  # Show only first 10
+                    output += f"Paragraph {i + 1}: {preview(paragraphs[i])}\n\n"
                 
-                if len(parsed_content) > 10:
-                    output += f"[{len(parsed_content) - 10} more paragraphs not shown]\n"
+                if len(paragraphs) > 10:
+                    output += f"[{len(paragraphs) - 10} more paragraphs not shown]\n"
             
             elif parse_level == 'sentences':
-                output = f"Parsed '{file_name}' into {len(parsed_content)} sentences:\n\n"
-                for i, sentence in enumerate(parsed_content[:15], 1):  # Show only first 15
-                    output += f"Sentence {i}: {sentence['content']}\n"
+                sentences = document.sentences
+                output = f"Parsed '{file_name}' into {len(sentences)} sentences:\n\n"
+                for i in range(min(15, len(sentences))):  # Show only first 15
+                    output += f"Sentence {i + 1}: {document.text(sentences[i])}\n"
                 
-                if len(parsed_content) > 15:
-                    output += f"\n[{len(parsed_content) - 15} more sentences not shown]\n"
+                if len(sentences) > 15:
+                    output += f"\n[{len(sentences) - 15} more sentences not shown]\n"
             
             else:
                 output = f"Unknown parse level: {parse_level}. Please use 'sections', 'paragraphs', or 'sentences'."
@@ -562,40 +667,29 @@ class ExtractInfoTool(BaseTool):
     name: str = "extract_information"
     description: str = "Extracts key information like dates, names, emails, URLs, and headers from a document. Use this to identify important elements in a file."
     args_schema: type[ExtractInfoInput] = ExtractInfoInput
-    file_cache: Dict[str, Any] = Field(default_factory=dict)
     
     def _run(self, file_id: str, info_types: str = "all") -> str:
         """Extracts key information from a document."""
         try:
-            # Check if we have the file content cached
-            if hasattr(self, 'file_cache') and file_id in self.file_cache:
-                file_data = self.file_cache[file_id]
-                content = file_data['content']
-                file_name = file_data['file_name']
-            else:
-                # Read the file if not cached
-                service = get_drive_service()
-                file_reader = FileReader(service)
-                result = file_reader.read_file(file_id)
-                
-                if result['status'] == 'error':
-                    return f"Error reading file: {result['error']}"
-                
-                content = result['content']
-                file_name = result['file_name']
-                
-                # Cache the content for later use
-                self.file_cache[file_id] = {
-                    'file_name': result['file_name'],
-                    'mime_type': result['mime_type'],
-                    'content': content,
-                    'access_time': datetime.datetime.now()
-                }
+            # Read the file (served from the shared content cache when possible)
+            service = get_drive_service()
+            file_reader = FileReader(service)
+            result = file_reader.read_file(file_id)
+            
+            if result['status'] == 'error':
+                return f"Error reading file: {result['error']}"
+            
+            content = result['content']
+            file_name = result['file_name']
             
             # Extract information
             extractor = InformationExtractor()
             extracted_info = extractor.extract_information(content, info_types)
             
+            def located(item):
+                line = content.count('\n', 0, item.positions[0]) + 1
+                return f" (line {line}, {item.count} times)" if item.count > 1 else f" (line {line})"
+            
             # Format the output
             output = f"Information extracted from '{file_name}':\n\n"
             
@@ -603,7 +697,7 @@ class ExtractInfoTool(BaseTool):
                 output += "📅 Dates:\n"
                 if extracted_info['dates']:
                     for i, date in enumerate(extracted_info['dates'][:15], 1):
-                        output += f"  {i}. {date}\n"
+                        output += f"  {i}. {date.value}{located(date)}\n"
                     if len(extracted_info['dates']) > 15:
                         output += f"  [and {len(extracted_info['dates']) - 15} more dates...]\n"
                 else:
@@ -614,7 +708,7 @@ class ExtractInfoTool(BaseTool):
                 output += "👤 Potential Names:\n"
                 if extracted_info['names']:
                     for i, name in enumerate(extracted_info['names'][:15], 1):
-                        output += f"  {i}. {name}\n"
+                        output += f"  {i}. {name.value}{located(name)}\n"
                     if len(extracted_info['names']) > 15:
                         output += f"  [and {len(extracted_info['names']) - 15} more names...]\n"
                 else:
@@ -625,7 +719,7 @@ class ExtractInfoTool(BaseTool):
                 output += "📧 Email Addresses:\n"
                 if extracted_info['emails']:
                     for i, email in enumerate(extracted_info['emails'][:15], 1):
-                        output += f"  {i}. {email}\n"
+                        output += f"  {i}. {email.value}{located(email)}\n"
                     if len(extracted_info['emails']) > 15:
                         output += f"  [and {len(extracted_info['emails']) - 15} more emails...]\n"
                 else:
@@ -636,7 +730,7 @@ class ExtractInfoTool(BaseTool):
                 output += "🔗 URLs:\n"
                 if extracted_info['urls']:
                     for i, url in enumerate(extracted_info['urls'][:15], 1):
-                        output += f"  {i}. {url}\n"
+                        output += f"  {i}. {url.value}{located(url)}\n"
                     if len(extracted_info['urls']) > 15:
                         output += f"  [and {len(extracted_info['urls']) - 15} more URLs...]\n"
                 else:
@@ -647,7 +741,7 @@ class ExtractInfoTool(BaseTool):
                 output += "📑 Document Headers:\n"
                 if extracted_info['headers']:
                     for i, header in enumerate(extracted_info['headers'][:15], 1):
-                        output += f"  {i}. {header}\n"
+                        output += f"  {i}. {header.value}{located(header)}\n"
                     if len(extracted_info['headers']) > 15:
                         output += f"  [and {len(extracted_info['headers']) - 15} more headers...]\n"
                 else:
@@ -663,69 +757,29 @@ class SummarizeDocumentTool(BaseTool):
     name: str = "summarize_document"
     description: str = "Creates a concise summary of a document. Useful for quickly understanding the main points without reading the entire file."
     args_schema: type[SummarizeDocumentInput] = SummarizeDocumentInput
-    file_cache: Dict[str, Any] = Field(default_factory=dict)
     
-    def _run(self, file_id: str, summary_length: str = "medium") -> str:
+    def _run(self, file_id: str, summary_length: str = "medium", section: Optional[str] = None) -> str:
         """Summarizes a document."""
         try:
-            # Check if we have the file content cached
-            if hasattr(self, 'file_cache') and file_id in self.file_cache:
-                file_data = self.file_cache[file_id]
-                content = file_data['content']
-                file_name = file_data['file_name']
-            else:
-                # Read the file if not cached
-                service = get_drive_service()
-                file_reader = FileReader(service)
-                result = file_reader.read_file(file_id)
-                
-                if result['status'] == 'error':
-                    return f"Error reading file: {result['error']}"
-                
-                content = result['content']
-                file_name = result['file_name']
-                
-                # Cache the content for later use
-                self.file_cache[file_id] = {
-                    'file_name': result['file_name'],
-                    'mime_type': result['mime_type'],
-                    'content': content,
-                    'access_time': datetime.datetime.now()
-                }
-            
-            # Determine summary parameters based on requested length
-            if summary_length.lower() == "short":
-                max_tokens = 150
-            elif summary_length.lower() == "long":
-                max_tokens = 500
-            else:  # medium or default
-                max_tokens = 250
-            
-            # Create a summary using LangChain's summarization
-            llm = ChatOpenAI(temperature=0)
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=2000,
-                chunk_overlap=200
-            )
-            
-            # Split the text into chunks for processing
-            texts = text_splitter.split_text(content)
+            # Read the file (served from the shared content cache when possible)
+            service = get_drive_service()
+            file_reader = FileReader(service)
+            result = file_reader.read_file(file_id)
             
-            # Convert to LangChain documents
-            docs = [LangchainDocument(page_content=t) for t in texts]
+            if result['status'] == 'error':
+                return f"Error reading file: {result['error']}"
             
-            # Load the summarize chain
-            chain = load_summarize_chain(
-                llm, 
-                chain_type="map_reduce", 
-                verbose=False
-            )
+            file_name = result['file_name']
             
-            # Generate summary
-            summary = chain.invoke(docs)
+            # Map summaries run concurrently and are cached per chunk; the
+            # final summary is cached per file version and length
+            summary = get_summarization_engine().summarize(result, summary_length, section)
             
             # Format the output
-            output = f"Summary of '{file_name}':\n\n{summary}\n\n"
+            if section:
+                output = f"Summary of section '{section}' of '{file_name}':\n\n{summary}\n\n"
+            else:
+                output = f"Summary of '{file_name}':\n\n{summary}\n\n"
             output += f"Note: This is a {summary_length} summary of the document content."
             
             return output
@@ -737,76 +791,63 @@ class SearchInDocumentTool(BaseTool):
     name: str = "search_in_document"
     description: str = "Searches for keywords or phrases within a document. Use this to find specific information in a file."
     args_schema: type[SearchInDocumentInput] = SearchInDocumentInput
-    file_cache: Dict[str, Any] = Field(default_factory=dict)
     
     def _run(self, file_id: str, query: str, case_sensitive: bool = False) -> str:
         """Searches for keywords or phrases within a document."""
         try:
-            # Check if we have the file content cached
-            if hasattr(self, 'file_cache') and file_id in self.file_cache:
-                file_data = self.file_cache[file_id]
-                content = file_data['content']
-                file_name = file_data['file_name']
-            else:
-                # Read the file if not cached
-                service = get_drive_service()
-                file_reader = FileReader(service)
-                result = file_reader.read_file(file_id)
-                
-                if result['status'] == 'error':
-                    return f"Error reading file: {result['error']}"
-                
-                content = result['content']
-                file_name = result['file_name']
-                
-                # Cache the content for later use
-                self.file_cache[file_id] = {
-                    'file_name': result['file_name'],
-                    'mime_type': result['mime_type'],
-                    'content': content,
-                    'access_time': datetime.datetime.now()
-                }
+            # Read the file (served from the shared content cache when possible)
+            service = get_drive_service()
+            file_reader = FileReader(service)
+            result = file_reader.read_file(file_id)
             
-            # Split content into sentences for context
-            sentences = sent_tokenize(content)
+            if result['status'] == 'error':
+                return f"Error reading file: {result['error']}"
+            
+            content = result['content']
+            file_name = result['file_name']
+            
+            # Sentence boundaries are offsets cached per file version; only
+            # the shown matches are sliced out
+            document = parse_result(result)
+            sentences = document.sentences
+            matches = list(document.find(query, case_sensitive))
             
             # Perform the search
             results = []
             search_flags = re.IGNORECASE if not case_sensitive else 0
             
-            for i, sentence in enumerate(sentences):
-                if re.search(re.escape(query), sentence, search_flags):
-                    # Get some context (previous and next sentence when available)
-                    start_idx = max(0, i - 1)
-                    end_idx = min(len(sentences) - 1, i + 1)
-                    
-                    context = " ".join(sentences[start_idx:end_idx + 1])
-                    
-                    # Highlight the match
-                    highlighted = re.sub(
-                        f"({re.escape(query)})",
-                        r"**\1**",  # Bold in markdown
-                        sentence,
-                        flags=search_flags
-                    )
-                    
-                    results.append({
-                        'sentence_num': i + 1,
-                        'highlighted': highlighted,
-                        'context': context
-                    })
+            for i, _, _ in matches[:10]:
+                # Get some context (previous and next sentence when available)
+                start_idx = max(0, i - 1)
+                end_idx = min(len(sentences) - 1, i + 1)
+                
+                context = " ".join(document.text(sentences[j]) for j in range(start_idx, end_idx + 1))
+                
+                # Highlight the match
+                highlighted = re.sub(
+                    f"({re.escape(query)})",
+                    r"**\1**",  # Bold in markdown
+                    document.text(sentences[i]),
+                    flags=search_flags
+                )
+                
+                results.append({
+                    'sentence_num': i + 1,
+                    'highlighted': highlighted,
+                    'context': context
+                })
             
             # Format the output
             if results:
-                output = f"Found {len(results)} matches for '{query}' in '{file_name}':\n\n"
+                output = f"Found {len(matches)} matches for '{query}' in '{file_name}':\n\n"
                 
                 for i, result in enumerate(results[:10], 1):
                     output += f"{i}. Match in sentence {result['sentence_num']}:\n"
                     output += f"   {result['highlighted']}\n\n"
                     output += f"   Context: {result['context']}\n\n"
                 
-                if len(results) > 10:
-                    output += f"[{len(results) - 10} more matches not shown]\n"
+                if len(matches) > 10:
+                    output += f"[{len(matches) - 10} more matches not shown]\n"
             else:
                 output = f"No matches found for '{query}' in '{file_name}'."
             
@@ -819,58 +860,22 @@ class AnswerQuestionTool(BaseTool):
     name: str = "answer_question"
     description: str = "Answers specific questions about the file contents using RAG (Retrieval-Augmented Generation). Use this to get precise information from the document."
     args_schema: type[AnswerQuestionInput] = AnswerQuestionInput
-    file_cache: Dict[str, Any] = Field(default_factory=dict)
     
     def _run(self, file_id: str, question: str) -> str:
         """Answers a question based on file contents."""
         try:
-            # Check if we have the file content cached
-            if hasattr(self, 'file_cache') and file_id in self.file_cache:
-                file_data = self.file_cache[file_id]
-                content = file_data['content']
-                file_name = file_data['file_name']
-            else:
-                # Read the file if not cached
-                service = get_drive_service()
-                file_reader = FileReader(service)
-                result = file_reader.read_file(file_id)
-                
-                if result['status'] == 'error':
-                    return f"Error reading file: {result['error']}"
-                
-                content = result['content']
-                file_name = result['file_name']
-                
-                # Cache the content for later use
-                self.file_cache[file_id] = {
-                    'file_name': result['file_name'],
-                    'mime_type': result['mime_type'],
-                    'content': content,
-                    'access_time': datetime.datetime.now()
-                }
-            
-            # Set up vector store for RAG
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            
-            # Split the text into chunks for processing
-            texts = text_splitter.split_text(content)
+            # Read the file (served from the shared content cache when possible)
+            service = get_drive_service()
+            file_reader = FileReader(service)
+            result = file_reader.read_file(file_id)
             
-            # Convert to LangChain documents with metadata
-            docs = [
-                LangchainDocument(
-                    page_content=t,
-                    metadata={"source": file_name, "file_id": file_id}
-                ) for t in texts
-            ]
+            if result['status'] == 'error':
+                return f"Error reading file: {result['error']}"
             
-            # Create embeddings
-            embeddings = OpenAIEmbeddings()
+            file_name = result['file_name']
             
-            # Create vector store
-            vectorstore = FAISS.from_documents(docs, embeddings)
+            # Reuse the vector index of this file version, building it only once
+            vectorstore = get_qa_index(result)
             
             # Create the retrieval QA chain
             qa = RetrievalQA.from_chain_type(
@@ -892,3 +897,122 @@ class AnswerQuestionTool(BaseTool):
         except Exception as e:
             return f"Error answering question: {str(e)}"
 
+class SearchDocumentContentsTool(BaseTool):
+    name: str = "search_document_contents"
+    description: str = "Searches the text of all previously read documents at once and returns the best matching files with snippets. Optionally give a folder_id to read and index that folder's documents first. Use this to find which documents mention something."
+    args_schema: type[SearchDocumentContentsInput] = SearchDocumentContentsInput
+    
+    def _run(self, query: str, page_size: int = 10, folder_id: Optional[str] = None) -> str:
+        """Searches across the locally indexed document contents."""
+        try:
+            index = get_fulltext_index()
+            if index is None:
+                return "Document content search is disabled."
+            
+            if folder_id:
+                # Make sure the folder's documents are indexed before searching
+                service = get_drive_service()
+                file_ids = []
+                for item, _ in iter_files(service, q=f"'{folder_id}' in parents and trashed = false",
+                                          fields="id, mimeType"):
+                    if item['mimeType'] != 'application/vnd.google-apps.folder':
+                        file_ids.append(item['id'])
+                    if len(file_ids) >= FULLTEXT_FOLDER_LIMIT:
+                        break
+                batch = FileReader(service).read_files(file_ids)
+                for result in batch['results']:
+                    index.index_result(result)
+            
+            matches = index.search(query, limit=page_size)
+            if not matches:
+                return f"No indexed documents match '{query}'. Documents are indexed once they have been read."
+            
+            metadata_index = get_metadata_index()
+            output = f"Documents matching '{query}':\n\n"
+            for idx, match in enumerate(matches, 1):
+                item = metadata_index.get(match['file_id']) if metadata_index is not None else None
+                if item is None:
+                    item = {'id': match['file_id'], 'name': match['name'], 'mimeType': match['mime_type']}
+                output += format_file_entry(idx, item, friendly_types=True).rstrip('\n') + "\n"
+                output += f"   Match: {match['snippet']}\n\n"
+            
+            return output
+        
+        except Exception as e:
+            return f"Error searching document contents: {str(e)}"
+
+class AnswerCorpusQuestionTool(BaseTool):
+    name: str = "answer_corpus_question"
+    description: str = "Answers a question using many documents at once: all documents in a folder, or the documents matching a search query. Returns the answer with the source documents it came from. Use this when the answer may be spread across several files."
+    args_schema: type[AnswerCorpusQuestionInput] = AnswerCorpusQuestionInput
+    
+    def _run(self, question: str, folder_id: Optional[str] = None, query: Optional[str] = None,
+             max_files: int = CORPUS_DEFAULT_FILES, k: int = 5) -> str:
+        """Answers a question from the passages most relevant across a set of documents."""
+        try:
+            if not folder_id and not query:
+                return "Please provide a folder_id or a query to select the documents."
+            
+            service = get_drive_service()
+            if folder_id:
+                drive_query = f"'{folder_id}' in parents and trashed = false"
+                scope = f"folder {folder_id}"
+            else:
+                drive_query = build_search_query(query)
+                scope = f"documents matching '{query}'"
+            
+            max_files = max(1, min(max_files, CORPUS_MAX_FILES))
+            versions = {}
+            for item, _ in iter_files(service, q=drive_query, fields="id, mimeType, md5Checksum, version"):
+                if item['mimeType'] != 'application/vnd.google-apps.folder':
+                    versions[item['id']] = disk_version(item)
+                if len(versions) >= max_files:
+                    break
+            if not versions:
+                return f"No documents found in {scope}."
+            
+            # Only documents that are new or changed since they were indexed are read
+            corpus = get_corpus_index(QA_INDEX_PARAMS)
+            stale = corpus.stale(versions)
+            unreadable = 0
+            reader = FileReader(service)
+            for i in range(0, len(stale), DRIVE_BATCH_LIMIT):
+                batch = reader.read_files(stale[i:i + DRIVE_BATCH_LIMIT])
+                documents = []
+                for result in batch['results']:
+                    if result['status'] == 'success' and result['content']:
+                        documents.append((result['file_id'], versions[result['file_id']], build_qa_documents(result)))
+                    else:
+                        unreadable += 1
+                corpus.update(documents)
+            if unreadable == len(versions):
+                return f"None of the {len(versions)} documents in {scope} could be read."
+            
+            passages = corpus.search(get_embeddings().embed_query(question), versions, k)
+            if not passages:
+                return f"No relevant passages found in {scope}."
+            
+            context = ""
+            for idx, (doc, _) in enumerate(passages, 1):
+                context += f"[{idx}] From '{doc.metadata['source']}':\n{doc.page_content}\n\n"
+            prompt = (
+                "Answer the question using only the numbered passages below. "
+                "Cite the passages you use like [1]. If the passages do not contain the answer, say so.\n\n"
+                f"{context}Question: {question}"
+            )
+            answer = ChatOpenAI(temperature=0).invoke(prompt).content
+            
+            # Format the output
+            output = f"Question about {len(versions) - unreadable} document(s) in {scope}:\n"
+            output += f"Q: {question}\n\n"
+            output += f"A: {answer}\n\n"
+            output += "Sources:\n"
+            for idx, (doc, _) in enumerate(passages, 1):
+                snippet = doc.page_content[:150].replace("\n", " ")
+                output += f"[{idx}] {doc.metadata['source']} (ID: {doc.metadata['file_id']})\n"
+                output += f"    {snippet}...\n"
+            
+            return output
+        
+        except Exception as e:
+            return f"Error answering question: {str(e)}"
@@ -0,0 +1,33 @@
+"""
+Google Drive AI Agent: Inter-process File Locks
+Advisory locks that serialize writers of the shared on-disk stores.
+
+Several MCP server processes can share one cache directory. A store takes an
+exclusive lock on a file next to its data while it makes a change that must not
+interleave with another process, such as rebuilding an index or allocating rows.
+Threads of one process still use the store's own threading lock as well.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: stores are only safe within one process
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if missing) for the duration of the block."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,160 @@
+"""
+Google Drive AI Agent: Local Full-Text Index
+A SQLite FTS5 inverted index over the text extracted by FileReader.read_file.
+
+Documents are added whenever a file is read and replaced when a new version of
+the file is read, so the index follows edits incrementally. Searches are ranked
+with BM25 (file names weigh more than body text) and return highlighted snippets.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+FULLTEXT_INDEX_ENABLED = os.getenv("FULLTEXT_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+FULLTEXT_INDEX_PATH = os.getenv("FULLTEXT_INDEX_PATH", ".cache/fulltext_index.sqlite3")
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
+    file_id UNINDEXED,
+    name,
+    content,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS indexed_files (
+    file_id TEXT PRIMARY KEY,
+    doc_rowid INTEGER NOT NULL,
+    version TEXT,
+    mime_type TEXT,
+    content_length INTEGER,
+    indexed_at REAL
+);
+"""
+
+
+def to_match_query(query):
+    """Turn a user query into an FTS5 MATCH expression.
+
+    A query wrapped in double quotes is searched as a phrase; otherwise every
+    word must appear somewhere in the document.
+    """
+    query = query.strip()
+    if len(query) > 1 and query.startswith('"') and query.endswith('"'):
+        terms = [query[1:-1]]
+    else:
+        terms = query.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms if term)
+
+
+class FullTextIndex:
+    """Ranked keyword and phrase search across every document that was read."""
+
+    def __init__(self, path=FULLTEXT_INDEX_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # Index writes happen off the read path, one at a time
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fulltext-index")
+
+    def index_document(self, file_id, version, name, mime_type, content):
+        """Add or replace a document. Returns False if it was already indexed."""
+        if not content:
+            return False
+        with self._lock, self._conn:
+            # Another process sharing the index may be writing the same file
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT doc_rowid, version, content_length FROM indexed_files WHERE file_id = ?",
+                (file_id,)
+            ).fetchone()
+            if row is not None:
+                # Same version: only re-index if this read got more text (e.g. more PDF pages)
+                if row['version'] == version and row['content_length'] >= len(content):
+                    return False
+                self._conn.execute("DELETE FROM documents WHERE rowid = ?", (row['doc_rowid'],))
+            cursor = self._conn.execute(
+                "INSERT INTO documents (file_id, name, content) VALUES (?, ?, ?)",
+                (file_id, name, content)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed_files "
+                "(file_id, doc_rowid, version, mime_type, content_length, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (file_id, cursor.lastrowid, version, mime_type, len(content), time.time())
+            )
+        return True
+
+    def index_result(self, result):
+        """Index a successful read_file result."""
+        if result.get('status') != 'success' or not result.get('file_id'):
+            return False
+        return self.index_document(
+            result['file_id'], result.get('version'), result.get('file_name'),
+            result.get('mime_type'), result.get('content')
+        )
+
+    def schedule(self, result):
+        """Index a read_file result in the background."""
+        self._writer.submit(self._index_quietly, result)
+
+    def _index_quietly(self, result):
+        try:
+            self.index_result(result)
+        except Exception as e:
+            logger.warning("Could not index %s: %s", result.get('file_id'), e)
+
+    def remove(self, file_id):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT doc_rowid FROM indexed_files WHERE file_id = ?", (file_id,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM documents WHERE rowid = ?", (row['doc_rowid'],))
+                self._conn.execute("DELETE FROM indexed_files WHERE file_id = ?", (file_id,))
+
+    def search(self, query, limit=10, offset=0):
+        """Return ranked matches with a highlighted snippet of the best passage."""
+        match = to_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.file_id, d.name, f.mime_type, f.version, "
+                "snippet(documents, 2, '**', '**', '...', 16) AS snippet, "
+                "bm25(documents, 0.0, 5.0, 1.0) AS score "
+                "FROM documents d JOIN indexed_files f ON f.doc_rowid = d.rowid "
+                "WHERE documents MATCH ? ORDER BY score LIMIT ? OFFSET ?",
+                (match, limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM indexed_files").fetchone()[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_fulltext_index():
+    """Return the process-wide full-text index, or None when it is disabled."""
+    global _index
+    if not FULLTEXT_INDEX_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FullTextIndex()
+    return _index
@@ -0,0 +1,133 @@
+"""
+Google Drive AI Agent: Information Extraction Engine
+Single-scan extraction of dates, names, emails, URLs and headers.
+
+Every pattern but the name pattern is compiled once into one regular expression
+of named alternatives, so the text is scanned a single time for them whatever is
+requested. Headers are matched with a zero-width lookahead at the start of each
+line, which lets dates and links inside a header line still be found by the same
+scan. Names can overlap dates and headers ('Board Meeting March 12, 2024'), so
+they are found by a second scan of their own. Results are de-duplicated as they
+are found and keep the character offsets of their occurrences.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+INFO_TYPES = ('dates', 'names', 'emails', 'urls', 'headers')
+# Occurrence offsets kept per extracted value
+MAX_POSITIONS = 20
+
+_MONTH = (r'(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?'
+          r'|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)')
+
+# Longest forms first: the first alternative that matches at a position wins.
+# The lookahead rejects most word starts before any month name is tried.
+DATE_PATTERN = (
+    r'(?i:\b(?=[JFMASOND\d])(?:'
+    + _MONTH + r'\s+\d{1,2}(?:st|nd|rd|th)?(?:,?\s+\d{4})?'
+    r'|\d{4}-\d{1,2}-\d{1,2}'
+    r'|\d{1,2}(?:(?:st|nd|rd|th)?\s+' + _MONTH + r',?\s+\d{4}|/\d{1,2}/\d{2,4}|-\d{1,2}-\d{4})'
+    r')\b)'
+)
+# Names stay on one line; a month followed by a day starts a date, not a name word
+_NAME_WORD = r'(?!' + _MONTH + r'\s+\d)[A-Z][a-z]+'
+NAME_PATTERN = r'\b' + _NAME_WORD + r'[ \t]+' + _NAME_WORD + r'(?:[ \t]+' + _NAME_WORD + r')?\b'
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+URL_PATTERN = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/\w\.-]*\b'
+# Markdown, uppercase, numbered and underlined headers; zero-width so the line is scanned again
+HEADER_PATTERN = (
+    r'^(?=#{1,6}[ \t]+(?P<header_markdown>[^\n]*\S)'
+    r'|(?P<header_uppercase>[A-Z][A-Z \t]*[A-Z])[ \t]*$'
+    r'|(?:\d+\.)+[ \t]+(?P<header_numbered>[^\n]*\S)'
+    r'|(?P<header_underlined>[^\n]*\S)[ \t]*\n(?:={2,}|-{2,})[ \t]*$)'
+)
+
+PATTERNS = {
+    'headers': HEADER_PATTERN,
+    'emails': EMAIL_PATTERN,
+    'urls': URL_PATTERN,
+    'dates': DATE_PATTERN,
+}
+
+NAME_FALSE_POSITIVES = {
+    'United States', 'New York', 'Los Angeles', 'San Francisco',
+    'Hong Kong', 'United Kingdom', 'Monday Morning', 'Tuesday Evening',
+    'Wednesday Afternoon', 'Thursday Night', 'Friday Morning',
+    'Saturday Evening', 'Sunday Afternoon'
+}
+
+HEADER_GROUPS = ('header_markdown', 'header_uppercase', 'header_numbered', 'header_underlined')
+
+NAME_REGEX = re.compile(NAME_PATTERN)
+
+
+class Extraction(NamedTuple):
+    """A distinct extracted value and where it occurs in the text."""
+    value: str
+    positions: Tuple[int, ...]
+    count: int
+
+
+def parse_info_types(info_types):
+    """Turn a comma-separated list such as 'dates, emails' or 'all' into a tuple of types."""
+    requested = {t.strip().lower() for t in (info_types or 'all').split(',')}
+    if 'all' in requested:
+        return INFO_TYPES
+    return tuple(t for t in INFO_TYPES if t in requested)
+
+
+@lru_cache(maxsize=None)
+def compile_extractor(info_types):
+    """One compiled pattern with a named alternative per requested type other than names.
+
+    Returns None when only names are requested.
+    """
+    # Emails are tried before URLs, and headers first since they never consume text
+    alternatives = [f"(?P<{info_type}>{PATTERNS[info_type]})"
+                    for info_type in PATTERNS if info_type in info_types]
+    if not alternatives:
+        return None
+    return re.compile("|".join(alternatives), re.MULTILINE)
+
+
+def extract(text, info_types=INFO_TYPES):
+    """Extract the requested types from text in one scan, plus one for names.
+
+    Returns a dict mapping each type to a list of Extraction in order of first
+    occurrence.
+    """
+    info_types = tuple(t for t in INFO_TYPES if t in info_types)
+    found = {info_type: {} for info_type in info_types}
+    if not text or not info_types:
+        return {info_type: [] for info_type in info_types}
+
+    def add(info_type, value, position):
+        entry = found[info_type].get(value)
+        if entry is None:
+            found[info_type][value] = [[position], 1]
+        else:
+            if len(entry[0]) < MAX_POSITIONS:
+                entry[0].append(position)
+            entry[1] += 1
+
+    extractor = compile_extractor(info_types)
+    if extractor is not None:
+        for match in extractor.finditer(text):
+            info_type = match.lastgroup
+            if info_type == 'headers':
+                value = next(match.group(group) for group in HEADER_GROUPS if match.group(group) is not None)
+                add(info_type, value.strip(), match.start())
+            else:
+                add(info_type, match.group(info_type), match.start())
+
+    if 'names' in info_types:
+        for match in NAME_REGEX.finditer(text):
+            if match.group() not in NAME_FALSE_POSITIVES:
+                add('names', match.group(), match.start())
+
+    return {
+        info_type: [Extraction(value, tuple(positions), count) for value, (positions, count) in values.items()]
+        for info_type, values in found.items()
+    }
@@ -0,0 +1,328 @@
+"""
+Google Drive AI Agent: Local Metadata Index
+A SQLite copy of the Drive's file metadata used to answer browsing tools locally.
+
+The index is filled by one paginated crawl of files().list and then kept current
+incrementally with changes().list from a stored startPageToken. Lookups check a
+freshness bound first and pull pending changes when the index is older than that.
+
+Several server processes can share the index file. Crawls and syncs hold a file
+lock, so only one process crawls the Drive and the others find the index ready
+once it is done; a crawl fills staging tables that replace the live ones in a
+single transaction, so readers never see a half-built index.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from app.tools.drive_service import get_drive_service, iter_files, LIST_PAGE_SIZE
+from app.tools.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+METADATA_INDEX_ENABLED = os.getenv("METADATA_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+METADATA_INDEX_PATH = os.getenv("METADATA_INDEX_PATH", ".cache/drive_index.sqlite3")
+# Pull changes from Drive when the index is older than this many seconds
+METADATA_INDEX_MAX_STALENESS = int(os.getenv("METADATA_INDEX_MAX_STALENESS", "60"))
+
+# Everything the browsing tools display, so they can be answered from the index
+INDEX_FIELDS = ("id, name, mimeType, parents, size, md5Checksum, version, trashed, "
+                "createdTime, modifiedTime, viewedByMeTime, description, webViewLink, "
+                "shared, starred, owners(displayName, emailAddress), "
+                "lastModifyingUser(displayName, emailAddress)")
+
+FILES_COLUMNS = """
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    mime_type TEXT,
+    size INTEGER,
+    modified_time TEXT,
+    md5 TEXT,
+    owners TEXT,
+    data TEXT NOT NULL
+"""
+PARENTS_COLUMNS = """
+    parent_id TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    PRIMARY KEY (parent_id, file_id)
+"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files ({FILES_COLUMNS});
+CREATE TABLE IF NOT EXISTS parents ({PARENTS_COLUMNS});
+CREATE INDEX IF NOT EXISTS parents_by_file ON parents (file_id);
+CREATE INDEX IF NOT EXISTS files_by_mime ON files (mime_type, modified_time);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class DriveMetadataIndex:
+    """SQLite index of Drive file metadata, synced with the Changes API."""
+
+    def __init__(self, path=METADATA_INDEX_PATH, max_staleness=METADATA_INDEX_MAX_STALENESS):
+        self.path = path
+        self.max_staleness = max_staleness
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_path = path + ".lock"
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._crawl_thread = None
+
+    # State
+
+    def _get_state(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_state(self, key, value):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def ready(self):
+        """Whether the initial crawl has completed."""
+        return self._get_state('start_page_token') is not None
+
+    @property
+    def last_sync(self):
+        value = self._get_state('last_sync')
+        return float(value) if value else 0.0
+
+    # Writes
+
+    def _upsert(self, item, files='files', parents='parents'):
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {files} (id, name, mime_type, size, modified_time, md5, owners, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                item['id'],
+                item.get('name'),
+                item.get('mimeType'),
+                int(item['size']) if item.get('size') else None,
+                item.get('modifiedTime'),
+                item.get('md5Checksum'),
+                json.dumps(item.get('owners', [])),
+                json.dumps(item),
+            )
+        )
+        self._conn.execute(f"DELETE FROM {parents} WHERE file_id = ?", (item['id'],))
+        self._conn.executemany(
+            f"INSERT OR IGNORE INTO {parents} (parent_id, file_id) VALUES (?, ?)",
+            [(parent, item['id']) for parent in item.get('parents', [])]
+        )
+
+    def _delete(self, file_id):
+        self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        self._conn.execute("DELETE FROM parents WHERE file_id = ?", (file_id,))
+
+    def full_crawl(self, service=None, if_missing=False):
+        """Rebuild the index from a complete paginated listing of the Drive.
+
+        With if_missing, a crawl that another process completed while this one
+        waited for the lock is used instead of crawling again.
+        """
+        service = service or get_drive_service()
+        with file_lock(self._lock_path):
+            if if_missing and self.ready:
+                return 0
+            return self._crawl(service)
+
+    def _crawl(self, service):
+        start = time.monotonic()
+        # Take the token first so changes made during the crawl are replayed afterwards
+        start_page_token = service.changes().getStartPageToken().execute()['startPageToken']
+        # files().list never returns the My Drive root folder, so it is looked up on its own
+        try:
+            root = service.files().get(fileId='root', fields=INDEX_FIELDS).execute()
+        except Exception as e:
+            logger.warning("Could not look up the My Drive root folder: %s", e)
+            root = None
+
+        # The live tables keep answering queries until the crawl is complete
+        with self._lock, self._conn:
+            self._conn.execute("DROP TABLE IF EXISTS files_staging")
+            self._conn.execute("DROP TABLE IF EXISTS parents_staging")
+            self._conn.execute(f"CREATE TABLE files_staging ({FILES_COLUMNS})")
+            self._conn.execute(f"CREATE TABLE parents_staging ({PARENTS_COLUMNS})")
+
+        count = 0
+        pending = []
+        for item, _ in iter_files(service, q="trashed = false", fields=INDEX_FIELDS):
+            pending.append(item)
+            if len(pending) >= LIST_PAGE_SIZE:
+                count += self._write_batch(pending, 'files_staging', 'parents_staging')
+                pending = []
+        count += self._write_batch(pending, 'files_staging', 'parents_staging')
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM parents")
+            self._conn.execute("INSERT INTO files SELECT * FROM files_staging")
+            self._conn.execute("INSERT INTO parents SELECT * FROM parents_staging")
+            self._conn.execute("DROP TABLE files_staging")
+            self._conn.execute("DROP TABLE parents_staging")
+            self._conn.execute("DELETE FROM state")
+            if root is not None:
+                self._set_state('root', json.dumps(root))
+            self._set_state('start_page_token', start_page_token)
+            self._set_state('last_sync', time.time())
+        logger.info("Indexed %d Drive files in %.1fs", count, time.monotonic() - start)
+        return count
+
+    def _write_batch(self, items, files='files', parents='parents'):
+        with self._lock, self._conn:
+            for item in items:
+                self._upsert(item, files, parents)
+        return len(items)
+
+    def sync(self, service=None):
+        """Apply pending changes since the stored page token. Returns the change count."""
+        service = service or get_drive_service()
+        if self._get_state('start_page_token') is None:
+            return self.full_crawl(service, if_missing=True)
+        with file_lock(self._lock_path):
+            return self._apply_changes(service)
+
+    def _apply_changes(self, service):
+        # Read under the file lock, since another process may have advanced it
+        page_token = self._get_state('start_page_token')
+        applied = 0
+        while page_token:
+            response = service.changes().list(
+                pageToken=page_token,
+                pageSize=LIST_PAGE_SIZE,
+                includeRemoved=True,
+                spaces='drive',
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({INDEX_FIELDS}))"
+            ).execute()
+            with self._lock, self._conn:
+                for change in response.get('changes', []):
+                    item = change.get('file')
+                    if change.get('removed') or not item or item.get('trashed'):
+                        self._delete(change['fileId'])
+                    else:
+                        self._upsert(item)
+                    applied += 1
+                if 'newStartPageToken' in response:
+                    self._set_state('start_page_token', response['newStartPageToken'])
+                    self._set_state('last_sync', time.time())
+            page_token = response.get('nextPageToken')
+        return applied
+
+    def ensure_fresh(self):
+        """Make the index usable: returns True if it may be queried.
+
+        Starts the initial crawl in the background the first time it is needed
+        and returns False until it finishes; afterwards pulls changes whenever
+        the index is older than max_staleness.
+        """
+        if not self.ready:
+            self._start_crawl()
+            return False
+        if time.time() - self.last_sync <= self.max_staleness:
+            return True
+        # Only one caller syncs; the others use the index as it is
+        if self._sync_lock.acquire(blocking=False):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning("Metadata index sync failed: %s", e)
+                return False
+            finally:
+                self._sync_lock.release()
+        return True
+
+    def _start_crawl(self):
+        with self._lock:
+            if self._crawl_thread is not None and self._crawl_thread.is_alive():
+                return
+            self._crawl_thread = threading.Thread(
+                target=self._crawl_in_background, name="drive-metadata-crawl", daemon=True)
+            self._crawl_thread.start()
+
+    def _crawl_in_background(self):
+        with self._sync_lock:
+            try:
+                self.full_crawl(if_missing=True)
+            except Exception as e:
+                logger.warning("Metadata index crawl failed: %s", e)
+
+    # Queries
+
+    def _root(self):
+        value = self._get_state('root')
+        return json.loads(value) if value else None
+
+    def resolve(self, file_id):
+        """Return the real ID of file_id, which may be the 'root' alias."""
+        if file_id == 'root':
+            root = self._root()
+            return root['id'] if root else file_id
+        return file_id
+
+    def get(self, file_id):
+        """Return the indexed metadata for a file (or the My Drive root), or None."""
+        root = self._root()
+        if root is not None and file_id in ('root', root['id']):
+            return root
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM files WHERE id = ?", (file_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def list_folder(self, folder_id, limit, offset=0):
+        """Return files directly inside a folder, most recently modified first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT f.data FROM parents p JOIN files f ON f.id = p.file_id "
+                "WHERE p.parent_id = ? ORDER BY f.modified_time DESC, f.id LIMIT ? OFFSET ?",
+                (self.resolve(folder_id), limit, offset)
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def find_by_mime_type(self, mime_type, limit, offset=0):
+        """Return files of a mime type, most recently modified first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM files WHERE mime_type = ? "
+                "ORDER BY modified_time DESC, id LIMIT ? OFFSET ?",
+                (mime_type, limit, offset)
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_metadata_index():
+    """Return the process-wide metadata index, or None when it is disabled."""
+    global _index
+    if not METADATA_INDEX_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DriveMetadataIndex()
+    return _index
+
+
+def get_fresh_index():
+    """Return the metadata index if it can answer queries right now, else None."""
+    index = get_metadata_index()
+    if index is not None and index.ensure_fresh():
+        return index
+    return None
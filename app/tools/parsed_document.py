@@ -0,0 +1,225 @@
+"""
+Google Drive AI Agent: Parsed Documents
+Compact, offset-based views of a document's sections, paragraphs and sentences.
+
+A ParsedDocument keeps one reference to the document text and describes its
+structure with arrays of start/end offsets instead of copied substrings. Each
+level is computed on first use, and text is only sliced out of the content when
+a caller actually displays or embeds it.
+
+Sentence segmentation is by far the most expensive level, so the sentence
+offsets of a read_file result are stored in the shared content cache (and on
+disk) per file version and reused by later searches and parses.
+"""
+
+import os
+import re
+import base64
+import bisect
+from array import array
+from collections import deque
+
+from app.tools.content_cache import content_cache, disk_content_cache
+from app.tools.section_parser import parse_sections, split_paragraphs, Section
+
+# Also keep sentence offsets in the persistent content cache
+SENTENCE_CACHE_DISK = os.getenv("SENTENCE_CACHE_DISK", "true").lower() in ("1", "true", "yes")
+# Stored with cached offsets so a different segmenter never reuses them
+SENTENCE_TOKENIZER_ID = "punkt_tab-english"
+
+_sentence_tokenizer = None
+
+
+def get_sentence_tokenizer():
+    """Return the shared English Punkt tokenizer (loaded from NLTK's punkt_tab)."""
+    global _sentence_tokenizer
+    if _sentence_tokenizer is None:
+        from nltk.tokenize import PunktTokenizer
+        _sentence_tokenizer = PunktTokenizer()
+    return _sentence_tokenizer
+
+
+class Spans:
+    """Ordered, non-overlapping (start, end) offsets stored in two int64 arrays."""
+
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, pairs=()):
+        self.starts = array('q')
+        self.ends = array('q')
+        for start, end in pairs:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        return self.starts[index], self.ends[index]
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    @property
+    def nbytes(self):
+        return (len(self.starts) + len(self.ends)) * self.starts.itemsize
+
+    def to_json(self):
+        return {
+            'starts': base64.b64encode(self.starts.tobytes()).decode('ascii'),
+            'ends': base64.b64encode(self.ends.tobytes()).decode('ascii'),
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        spans = cls()
+        spans.starts.frombytes(base64.b64decode(data['starts']))
+        spans.ends.frombytes(base64.b64decode(data['ends']))
+        return spans
+
+    def locate(self, offset):
+        """Index of the span containing offset, or of the last one starting before it."""
+        return max(0, bisect.bisect_right(self.starts, offset) - 1)
+
+
+def pack_spans(units, size, overlap):
+    """Greedily join consecutive unit spans into chunks of at most size characters.
+
+    Each chunk after the first starts with the trailing units of the previous
+    chunk that fit within overlap characters, as long as the next unit still
+    fits after them; a chunk never ends where the previous one did.
+    """
+    chunks = []
+    window = deque()
+    for unit in units:
+        if window and unit[1] - window[0][0] > size:
+            end = window[-1][1]
+            chunks.append((window[0][0], end))
+            # Like LangChain's _merge_splits: shed units from the front of the
+            # overlap until it is short enough and the next unit fits after it
+            while window and (end - window[0][0] > overlap or unit[1] - window[0][0] > size):
+                window.popleft()
+        window.append(unit)
+    if window:
+        chunks.append((window[0][0], window[-1][1]))
+    return chunks
+
+
+class ParsedDocument:
+    """Sections, paragraphs and sentences of one text, as offsets into it."""
+
+    __slots__ = ('content', '_section_titles', '_section_kinds', '_sections', '_paragraphs', '_sentences',
+                 '_on_sentences')
+
+    def __init__(self, content, sentences=None, on_sentences=None):
+        self.content = content
+        self._section_titles = None
+        self._section_kinds = None
+        self._sections = None
+        self._paragraphs = None
+        # Sentence boundaries may be supplied from a cache, and handed back to
+        # on_sentences when they had to be computed
+        self._sentences = sentences
+        self._on_sentences = on_sentences
+
+    def text(self, span):
+        """The text of a (start, end) span."""
+        start, end = span
+        return self.content[start:end]
+
+    @property
+    def sections(self):
+        if self._sections is None:
+            parsed = parse_sections(self.content)
+            self._section_titles = [section.title for section in parsed]
+            self._section_kinds = [section.kind for section in parsed]
+            self._sections = Spans((section.start, section.end) for section in parsed)
+        return self._sections
+
+    def section(self, index):
+        """The Section (title, start, end, kind) at index."""
+        start, end = self.sections[index]
+        return Section(self._section_titles[index], start, end, self._section_kinds[index])
+
+    @property
+    def paragraphs(self):
+        if self._paragraphs is None:
+            self._paragraphs = Spans(split_paragraphs(self.content))
+        return self._paragraphs
+
+    @property
+    def sentences(self):
+        if self._sentences is None:
+            self._sentences = Spans(get_sentence_tokenizer().span_tokenize(self.content))
+            if self._on_sentences is not None:
+                self._on_sentences(self._sentences)
+        return self._sentences
+
+    def find(self, query, case_sensitive=False):
+        """Yield (sentence_index, match_start, match_end) for the first match in each sentence."""
+        pattern = re.compile(re.escape(query), 0 if case_sensitive else re.IGNORECASE)
+        sentences = self.sentences
+        if not len(sentences):
+            return
+        last = -1
+        for match in pattern.finditer(self.content):
+            index = sentences.locate(match.start())
+            if index != last:
+                last = index
+                yield index, match.start(), match.end()
+
+    def chunk_spans(self, size, overlap=0):
+        """Split the text into chunks of at most size characters along paragraph and sentence boundaries."""
+        sentences = None
+        units = []
+        for start, end in self.paragraphs:
+            if end - start <= size:
+                units.append((start, end))
+                continue
+            # Paragraphs that are too long are split into sentences, then hard-split
+            if sentences is None:
+                sentences = self.sentences
+            index = sentences.locate(start)
+            while index < len(sentences) and sentences.starts[index] < end:
+                s_start = max(start, sentences.starts[index])
+                s_end = min(end, sentences.ends[index])
+                for piece in range(s_start, s_end, size):
+                    units.append((piece, min(piece + size, s_end)))
+                index += 1
+        return pack_spans(units, size, overlap)
+
+
+def _disk_key(result):
+    """Disk cache (file_id, version, variant) of a result's sentence offsets."""
+    cache_key = result['cache_key']
+    variant = f"{cache_key[2]}-sentences" if len(cache_key) > 2 else "sentences"
+    return result['file_id'], result.get('checksum') or result.get('version') or '', variant
+
+
+def parse_result(result):
+    """Return a ParsedDocument of a read_file result, reusing cached sentence offsets."""
+    content = result['content']
+    if not result.get('cache_key') or not result.get('file_id'):
+        return ParsedDocument(content)
+
+    key = tuple(result['cache_key']) + ('sentences',)
+    sentences = content_cache.get(key)
+    if sentences is None and SENTENCE_CACHE_DISK:
+        stored = disk_content_cache.get(*_disk_key(result))
+        if stored and stored.get('tokenizer') == SENTENCE_TOKENIZER_ID and stored.get('length') == len(content):
+            sentences = Spans.from_json(stored)
+            content_cache.put(key, sentences, size=sentences.nbytes)
+    if sentences is not None:
+        return ParsedDocument(content, sentences=sentences)
+
+    def store(spans):
+        content_cache.put(key, spans, size=spans.nbytes)
+        if SENTENCE_CACHE_DISK:
+            file_id, version, variant = _disk_key(result)
+            disk_content_cache.put(
+                file_id, version,
+                dict(spans.to_json(), tokenizer=SENTENCE_TOKENIZER_ID, length=len(content)),
+                variant
+            )
+
+    return ParsedDocument(content, on_sentences=store)
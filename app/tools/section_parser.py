@@ -0,0 +1,100 @@
+"""
+Google Drive AI Agent: Section Parser
+Single-pass, line-oriented detection of document sections.
+
+Markdown headings, numbered headings, uppercase lines and lines ending with a
+colon are recognized by one combined regular expression in a single scan of the
+text. Sections are returned as offsets into the original content rather than
+copied substrings; each one runs from its heading to the next heading, so
+sections never overlap and the whole scan is linear in the size of the text.
+"""
+
+import re
+from typing import List, NamedTuple
+
+# Uppercase and colon headings longer than this are treated as ordinary text
+MAX_HEADING_LENGTH = 100
+
+HEADING_PATTERN = re.compile(
+    r'^(?:'
+    r'#{1,6}[ \t]+(?P<markdown>[^\n]*\S)'
+    r'|(?:\d+\.)+[ \t]+(?P<numbered>[^\n]*\S)'
+    r'|(?P<uppercase>[A-Z][A-Z \t]*[A-Z])'
+    r'|(?P<colon>[^:\n]*[^:\s]):'
+    r')[ \t]*$',
+    re.MULTILINE
+)
+
+# A blank line, together with any whitespace around it
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+
+
+class Section(NamedTuple):
+    """A section of a document as offsets into its content."""
+    title: str
+    start: int
+    end: int
+    kind: str
+
+
+def _trim(content, start, end):
+    """Shrink [start, end) so it neither starts nor ends with whitespace."""
+    while start < end and content[start].isspace():
+        start += 1
+    while end > start and content[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def iter_headings(content):
+    """Yield (start, kind, title) for every heading line, in document order."""
+    for match in HEADING_PATTERN.finditer(content):
+        kind = match.lastgroup
+        title = match.group(kind).strip()
+        if kind in ('uppercase', 'colon') and len(title) > MAX_HEADING_LENGTH:
+            continue
+        yield match.start(), kind, title
+
+
+def split_paragraphs(content):
+    """Return (start, end) offsets of the blank-line separated paragraphs."""
+    spans = []
+    position = 0
+    for match in PARAGRAPH_BREAK.finditer(content):
+        start, end = _trim(content, position, match.start())
+        if start < end:
+            spans.append((start, end))
+        position = match.end()
+    start, end = _trim(content, position, len(content))
+    if start < end:
+        spans.append((start, end))
+    return spans
+
+
+def parse_sections(content) -> List[Section]:
+    """Split content into sections at its headings.
+
+    Text before the first heading becomes an 'Introduction' section. Without
+    any headings, blank-line separated parts become numbered sections.
+    """
+    if not content:
+        return []
+
+    headings = list(iter_headings(content))
+    if not headings:
+        paragraphs = split_paragraphs(content)
+        if len(paragraphs) > 1:
+            return [Section(f"Section {i}", start, end, 'paragraph')
+                    for i, (start, end) in enumerate(paragraphs, 1)]
+        start, end = _trim(content, 0, len(content))
+        return [Section("Document Content", start, end, 'document')]
+
+    sections = []
+    start, end = _trim(content, 0, headings[0][0])
+    if start < end:
+        sections.append(Section("Introduction", start, end, 'preamble'))
+    for i, (heading_start, kind, title) in enumerate(headings):
+        next_start = headings[i + 1][0] if i + 1 < len(headings) else len(content)
+        start, end = _trim(content, heading_start, next_start)
+        sections.append(Section(title, start, end, kind))
+    return sections
@@ -0,0 +1,503 @@
+"""
+Google Drive AI Agent: Summarization Engine
+Concurrent, cached map-reduce and hierarchical summarization of documents.
+
+Documents are split into chunks and every chunk is summarized concurrently
+through one shared chat model. Chunk summaries are cached by a hash of the chunk
+text, so re-summarizing an edited document only summarizes the chunks that
+changed. Final summaries are cached per file version and summary length. The
+length budget caps the final answer, and chunk summaries are only collapsed in
+extra reduce passes when they do not fit in a single reduce prompt.
+
+Very large documents get a summary tree (chunk -> section -> document) built by
+a background job and stored next to the cached content. Sections follow the
+document's own headings, and chunks never cross a section boundary. The first
+request is answered from the chunk summaries as soon as they exist, while the
+upper levels are still being built; later summaries of any length or of a
+single section are served from the stored tree, and a new version of the
+document only re-summarizes the chunks and sections that changed.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple
+
+from langchain_openai import ChatOpenAI
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.tools.content_cache import disk_content_cache
+from app.tools.embedding_pipeline import TokenCounter
+from app.tools.section_parser import parse_sections
+from app.tools.vector_store import index_version
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-3.5-turbo")
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", ".cache/summaries.sqlite3")
+# Most cached chunk summaries; the least recently used ones are dropped
+SUMMARY_CACHE_MAX_CHUNKS = int(os.getenv("SUMMARY_CACHE_MAX_CHUNKS", "100000"))
+# Concurrent LLM calls of the map step
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "8"))
+SUMMARY_CHUNK_SIZE = 2000
+SUMMARY_CHUNK_OVERLAP = 200
+# Longest summary of a single chunk
+MAP_MAX_TOKENS = 200
+# Most tokens of chunk summaries combined in one reduce prompt
+REDUCE_INPUT_TOKENS = 6000
+
+# Documents at least this long are summarized through a summary tree
+SUMMARY_TREE_MIN_CHARS = int(os.getenv("SUMMARY_TREE_MIN_CHARS", "100000"))
+# Build summary trees in the background as soon as large documents are read
+SUMMARY_TREE_PREBUILD = os.getenv("SUMMARY_TREE_PREBUILD", "false").lower() in ("1", "true", "yes")
+SUMMARY_TREE_WORKERS = 2
+# Chunks per section of a summary tree for documents without headings; documents
+# with headings get one section per heading
+SECTION_CHUNKS = 12
+SECTION_MAX_TOKENS = 400
+
+# Token budget of the final summary for each requested length
+SUMMARY_LENGTHS = {'short': 150, 'medium': 250, 'long': 500}
+
+MAP_PROMPT = """Write a concise summary of the following text. Keep names, numbers and dates.
+
+{text}
+
+CONCISE SUMMARY:"""
+
+# A single text, such as a document that fits in one chunk, summarized to a budget
+TEXT_PROMPT = """Write a summary of the following text in at most {words} words. Keep names, numbers and dates.
+
+{text}
+
+SUMMARY:"""
+
+REDUCE_PROMPT = """The following are summaries of consecutive parts of a document.
+Combine them into a single summary of at most {words} words that covers the main points in order.
+
+{text}
+
+SUMMARY:"""
+
+SECTION_PROMPT = """The following are summaries of consecutive parts of one section of a document.
+Combine them into a single summary of at most 300 words that covers the main points in order.
+
+{text}
+
+SECTION SUMMARY:"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunk_summaries (
+    hash TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunk_summaries_by_use ON chunk_summaries (last_used);
+CREATE TABLE IF NOT EXISTS document_summaries (
+    file_id TEXT NOT NULL,
+    version TEXT NOT NULL,
+    length TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (file_id, version, length)
+);
+"""
+
+
+class TreeBuild(NamedTuple):
+    """Futures of a summary tree build: its chunk summaries and the finished tree."""
+    leaves: Future
+    tree: Future
+
+
+def summary_hash(model, prompt, text):
+    """Cache key of a chunk summary: the model, the prompt and the exact text."""
+    return hashlib.sha256(f"{model}\0{prompt}\0{text}".encode('utf-8')).hexdigest()
+
+
+def find_section(tree, section):
+    """Find a section of a summary tree by number or by a word of its title."""
+    sections = tree['sections']
+    key = str(section).strip()
+    if key.isdigit() and 1 <= int(key) <= len(sections):
+        return sections[int(key) - 1]
+    for entry in sections:
+        titles = [entry['title']] + entry.get('headings', [])
+        if any(key.lower() in title.lower() for title in titles):
+            return entry
+    available = "\n".join(f"{entry['number']}. {entry['title']}" for entry in sections[:20])
+    raise ValueError(f"No section matches '{section}'. Available sections:\n{available}")
+
+
+def max_tokens_for(length):
+    """Token budget of a summary length name ('short', 'medium' or 'long')."""
+    return SUMMARY_LENGTHS.get((length or '').lower(), SUMMARY_LENGTHS['medium'])
+
+
+class SummaryStore:
+    """SQLite cache of chunk summaries and of final document summaries."""
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, max_chunks=SUMMARY_CACHE_MAX_CHUNKS):
+        self.max_chunks = max_chunks
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_chunks(self, hashes):
+        """Return a dict of hash -> summary for the cached chunk hashes."""
+        found = {}
+        hashes = list(hashes)
+        with self._lock, self._conn:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i + 500]
+                found.update(self._conn.execute(
+                    f"SELECT hash, summary FROM chunk_summaries WHERE hash IN ({','.join('?' * len(part))})",
+                    part
+                ).fetchall())
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE chunk_summaries SET last_used = ? WHERE hash = ?", [(now, h) for h in found])
+        return found
+
+    def put_chunks(self, items):
+        """Store (hash, summary) pairs, dropping the least recently used beyond the cap."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_summaries (hash, summary, last_used) VALUES (?, ?, ?)",
+                [(hash_, summary, now) for hash_, summary in items]
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM chunk_summaries").fetchone()[0] - self.max_chunks
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM chunk_summaries WHERE hash IN "
+                    "(SELECT hash FROM chunk_summaries ORDER BY last_used LIMIT ?)", (excess,))
+
+    def get_document(self, file_id, version, length):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM document_summaries WHERE file_id = ? AND version = ? AND length = ?",
+                (file_id, version, length)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_document(self, file_id, version, length, summary):
+        """Store a final summary and forget the summaries of older versions."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM document_summaries WHERE file_id = ? AND version != ?", (file_id, version))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO document_summaries (file_id, version, length, summary, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (file_id, version, length, summary, time.time())
+            )
+
+
+class SummarizationEngine:
+    """Map-reduce summarizer with a shared model and cached intermediate results."""
+
+    def __init__(self, llm=None, store=None, model=SUMMARY_MODEL, max_concurrency=SUMMARY_MAX_CONCURRENCY):
+        self.model = model
+        self.llm = llm or ChatOpenAI(model=model, temperature=0)
+        self.store = store or SummaryStore()
+        self.max_concurrency = max_concurrency
+        self.count_tokens = TokenCounter(model)
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=SUMMARY_CHUNK_SIZE,
+            chunk_overlap=SUMMARY_CHUNK_OVERLAP
+        )
+        self._tree_builder = ThreadPoolExecutor(max_workers=SUMMARY_TREE_WORKERS, thread_name_prefix="summary-tree")
+        self._tree_builds = {}
+        self._tree_lock = threading.RLock()
+
+    def summarize(self, result, length="medium", section=None):
+        """Summarize a successful read_file result, or one section of it.
+
+        Cached summaries are reused; large documents and section requests are
+        served from the document's summary tree.
+        """
+        length = (length or "").lower()
+        if length not in SUMMARY_LENGTHS:
+            length = "medium"
+        max_tokens = max_tokens_for(length)
+        file_id = result.get('file_id')
+        version = index_version(result)
+        cache_length = length if section is None else f"{length}|section:{section}"
+        if file_id and version:
+            cached = self.store.get_document(file_id, version, cache_length)
+            if cached is not None:
+                return cached
+
+        if section is not None or len(result['content']) >= SUMMARY_TREE_MIN_CHARS:
+            summary = self._summarize_from_tree(result, max_tokens, section)
+        else:
+            summary = self.summarize_text(result['content'], max_tokens)
+        if file_id and version:
+            self.store.put_document(file_id, version, cache_length, summary)
+        return summary
+
+    def summarize_text(self, text, max_tokens):
+        """Summarize text in at most max_tokens tokens."""
+        chunks = self.splitter.split_text(text)
+        if not chunks:
+            return ""
+        if len(chunks) == 1 and self.count_tokens(chunks[0]) <= REDUCE_INPUT_TOKENS:
+            return self._summarize_one(chunks[0], max_tokens)
+        return self._reduce(self.map_chunks(chunks), max_tokens)
+
+    def map_chunks(self, chunks):
+        """Summarize each chunk, calling the model only for chunks not cached yet."""
+        return self._summarize_cached(chunks, MAP_PROMPT, MAP_MAX_TOKENS)
+
+    def _summarize_cached(self, texts, prompt, max_tokens):
+        """Summarize each text with prompt, reusing summaries cached by text hash."""
+        hashes = [summary_hash(self.model, prompt, text) for text in texts]
+        summaries = self.store.get_chunks(set(hashes))
+
+        missing = {}
+        for hash_, text in zip(hashes, texts):
+            if hash_ not in summaries and hash_ not in missing:
+                missing[hash_] = text
+        if missing:
+            start = time.monotonic()
+            new_summaries = self._complete(
+                [prompt.format(text=text) for text in missing.values()], max_tokens)
+            new_items = list(zip(missing.keys(), new_summaries))
+            self.store.put_chunks(new_items)
+            summaries.update(new_items)
+            logger.info("Summarized %d of %d texts in %.1fs (%d cached)", len(missing), len(texts),
+                        time.monotonic() - start, len(texts) - len(missing))
+        return [summaries[hash_] for hash_ in hashes]
+
+    def _condense(self, summary, max_tokens):
+        """Shorten a summary to the budget, or return it as is when it already fits."""
+        if self.count_tokens(summary) <= max_tokens:
+            return summary
+        return self._summarize_one(summary, max_tokens)
+
+    def _summarize_one(self, text, max_tokens):
+        """Summarize a single text that fits one prompt in at most max_tokens tokens."""
+        words = max(1, int(max_tokens * 0.75))
+        # Leave headroom so the summary is not cut off mid-sentence
+        return self._complete([TEXT_PROMPT.format(words=words, text=text)], int(max_tokens * 1.25))[0]
+
+    # Summary trees
+
+    def _tree_params(self):
+        return f"{self.model}|{SUMMARY_CHUNK_SIZE}|{SUMMARY_CHUNK_OVERLAP}|sections|{SECTION_CHUNKS}"
+
+    @staticmethod
+    def _tree_key(result):
+        # Same version as the disk content cache, so the tree lives next to the content
+        variant = "summary-tree"
+        if 'pages_read' in result:
+            variant += f"-p{result['pages_read']}"
+        return result.get('file_id'), result.get('checksum') or result.get('version') or '', variant
+
+    def _stored_tree(self, result):
+        file_id, version, variant = self._tree_key(result)
+        tree = disk_content_cache.get(file_id, version, variant) if file_id else None
+        if tree is not None and tree.get('params') == self._tree_params():
+            return tree
+        return None
+
+    def _summarize_from_tree(self, result, max_tokens, section=None):
+        """Summarize from the stored tree, or from its chunk summaries while it is still being built.
+
+        The first request for a large document does not wait for the section and
+        document levels of the tree: it reduces the chunk summaries as soon as the
+        map step of the build has finished.
+        """
+        tree = self._stored_tree(result)
+        if tree is not None:
+            summary = tree['summary'] if section is None else find_section(tree, section)['summary']
+            return self._condense(summary, max_tokens)
+        leaves = self.schedule_tree(result).leaves.result()
+        summaries = leaves['chunk_summaries']
+        if section is not None:
+            node = find_section(leaves, section)
+            summaries = summaries[node['first_chunk']:node['first_chunk'] + node['chunks']]
+        if not summaries:
+            return ""
+        return self._reduce(summaries, max_tokens)
+
+    def get_tree(self, result, wait=True):
+        """Return the summary tree of a read_file result.
+
+        A stored tree is returned at once; otherwise the background builder is
+        asked for it and, unless wait is False, the call waits for the build.
+        """
+        tree = self._stored_tree(result)
+        if tree is not None:
+            return tree
+        build = self.schedule_tree(result)
+        return build.tree.result() if wait else None
+
+    def schedule_tree(self, result):
+        """Build the summary tree of a read_file result in the background.
+
+        Returns a TreeBuild whose leaves future resolves once every chunk is
+        summarized and whose tree future resolves with the finished tree;
+        concurrent requests for the same tree share one build.
+        """
+        key = self._tree_key(result)
+        with self._tree_lock:
+            build = self._tree_builds.get(key)
+            if build is None:
+                leaves = Future()
+                build = TreeBuild(leaves, self._tree_builder.submit(self._build_tree, result, leaves))
+                self._tree_builds[key] = build
+                build.tree.add_done_callback(lambda _: self._forget_build(key))
+        return build
+
+    def _forget_build(self, key):
+        with self._tree_lock:
+            self._tree_builds.pop(key, None)
+
+    def _layout(self, content):
+        """Split content into tree nodes at its section boundaries, then each node into chunks.
+
+        Consecutive sections that together fit in one chunk share a node, so
+        documents with many short headings do not get a node per line. Documents
+        without headings are grouped into nodes of about SECTION_CHUNKS chunks.
+        """
+        sections = parse_sections(content)
+        paragraphs = bool(sections) and sections[0].kind in ('paragraph', 'document')
+        node_chars = SECTION_CHUNKS * SUMMARY_CHUNK_SIZE if paragraphs else SUMMARY_CHUNK_SIZE
+
+        nodes = []
+        for section in sections:
+            if nodes and section.end - nodes[-1]['start'] <= node_chars:
+                nodes[-1]['end'] = section.end
+                nodes[-1]['headings'].append(section.title)
+            else:
+                nodes.append({'start': section.start, 'end': section.end, 'headings': [section.title]})
+
+        chunks = []
+        for number, node in enumerate(nodes, start=1):
+            text = content[node['start']:node['end']]
+            node_chunks = self.splitter.split_text(text)
+            if paragraphs:
+                title = text.strip().split("\n", 1)[0]
+                node['headings'] = []
+            else:
+                title = node['headings'][0]
+            node.update(number=number, title=title[:80], first_chunk=len(chunks), chunks=len(node_chunks))
+            chunks.extend(node_chunks)
+        return nodes, chunks
+
+    def _build_tree(self, result, leaves=None):
+        """Summarize chunks, then the document's sections, then the whole document.
+
+        leaves, a Future, is resolved with the chunk summaries as soon as they
+        are all known, before the upper levels of the tree are built.
+        """
+        try:
+            start_time = time.monotonic()
+            content = result['content']
+            nodes, chunks = self._layout(content)
+            chunk_summaries = self.map_chunks(chunks)
+            if leaves is not None:
+                leaves.set_result({'sections': nodes, 'chunk_summaries': chunk_summaries})
+
+            # A one-chunk section is summarized by its chunk summary
+            section_summaries = [None] * len(nodes)
+            grouped = {}
+            for position, node in enumerate(nodes):
+                parts = chunk_summaries[node['first_chunk']:node['first_chunk'] + node['chunks']]
+                if len(parts) == 1:
+                    section_summaries[position] = parts[0]
+                elif len(parts) > 1 and self.count_tokens("\n\n".join(parts)) > REDUCE_INPUT_TOKENS:
+                    section_summaries[position] = self._reduce(parts, SECTION_MAX_TOKENS)
+                elif parts:
+                    grouped[position] = "\n\n".join(parts)
+            for position, summary in zip(grouped, self._summarize_cached(
+                    list(grouped.values()), SECTION_PROMPT, SECTION_MAX_TOKENS)):
+                section_summaries[position] = summary
+
+            sections = [
+                dict(node, summary=summary)
+                for node, summary in zip(nodes, section_summaries) if summary is not None
+            ]
+            tree = {
+                'file_id': result.get('file_id'),
+                'version': index_version(result),
+                'params': self._tree_params(),
+                'sections': sections,
+                'summary': self._reduce([section['summary'] for section in sections],
+                                        SUMMARY_LENGTHS['long']) if sections else "",
+            }
+        except BaseException as e:
+            if leaves is not None and not leaves.done():
+                leaves.set_exception(e)
+            raise
+        file_id, version, variant = self._tree_key(result)
+        if file_id:
+            disk_content_cache.put(file_id, version, tree, variant)
+        logger.info("Built summary tree of %s: %d chunks, %d sections in %.1fs",
+                    file_id, len(chunks), len(sections), time.monotonic() - start_time)
+        return tree
+
+    def _reduce(self, summaries, max_tokens):
+        """Combine summaries into one, collapsing groups first if they do not fit one prompt."""
+        words = max(1, int(max_tokens * 0.75))
+        while True:
+            groups = self._group(summaries)
+            if len(groups) == 1:
+                # Leave headroom so the summary is not cut off mid-sentence
+                return self._complete(
+                    [REDUCE_PROMPT.format(words=words, text=groups[0])], int(max_tokens * 1.25))[0]
+            # Collapsed summaries must stay short enough to be combined again
+            group_tokens = max(max_tokens, REDUCE_INPUT_TOKENS // len(groups))
+            summaries = self._complete(
+                [REDUCE_PROMPT.format(words=int(group_tokens * 0.75), text=group) for group in groups],
+                group_tokens)
+
+    def _group(self, summaries):
+        """Join consecutive summaries into groups that fit one reduce prompt."""
+        groups, current, tokens = [], [], 0
+        for summary in summaries:
+            n = self.count_tokens(summary)
+            if current and tokens + n > REDUCE_INPUT_TOKENS:
+                groups.append("\n\n".join(current))
+                current, tokens = [], 0
+            current.append(summary)
+            tokens += n
+        if current:
+            groups.append("\n\n".join(current))
+        if len(groups) > 1 and len(groups) == len(summaries):
+            # Every summary fills a prompt on its own: pair them so the reduction progresses
+            groups = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+        return groups
+
+    def _complete(self, prompts, max_tokens):
+        """Run prompts through the shared model with bounded concurrency."""
+        llm = self.llm.bind(max_tokens=max_tokens)
+        responses = llm.batch(prompts, config={'max_concurrency': self.max_concurrency})
+        return [response.content.strip() for response in responses]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_summarization_engine():
+    """Return the process-wide summarization engine."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SummarizationEngine()
+    return _engine
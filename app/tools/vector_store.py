@@ -0,0 +1,351 @@
+"""
+Google Drive AI Agent: Vector Index Store
+Per-file FAISS indexes built once per file version and reused across questions.
+
+Indexes are saved under a configurable directory with FAISS.save_local and loaded
+back on later questions; the most recently used ones stay in memory. A new
+version of a file (different md5Checksum or Drive version) gets a new index and
+the old one is deleted.
+
+FAISS.load_local unpickles the docstore saved next to each index, so anything
+that can write to VECTOR_INDEX_DIR can run code in this process. The directory
+must only be writable by the agent itself; never point it at a shared or
+downloaded location.
+
+Questions over many documents use a separate corpus index: one persistent FAISS
+index over the chunks of every document that has been asked about, with the
+chunk text and each document's version in SQLite. Documents are added, replaced
+or removed individually, so a question only reads the documents that are new or
+changed since they were indexed, and a search is restricted to the documents in
+scope with an ID selector instead of loading per-file indexes.
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_community.vectorstores import FAISS
+
+from app.tools.embedding_cache import CachedEmbeddings, EMBEDDING_CACHE_ENABLED
+from app.tools.embedding_pipeline import EmbeddingPipeline
+from app.tools.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Trusted: saved indexes are unpickled when they are loaded (see above)
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", ".cache/vectors")
+# Number of loaded indexes kept in memory
+VECTOR_INDEX_MEMORY_SLOTS = int(os.getenv("VECTOR_INDEX_MEMORY_SLOTS", "16"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+# Directory of the corpus-level index used for questions over many documents
+CORPUS_INDEX_DIR = os.getenv("CORPUS_INDEX_DIR", ".cache/corpus")
+
+CORPUS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    params TEXT NOT NULL,
+    chunks INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_id TEXT NOT NULL,
+    source TEXT,
+    start INTEGER,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_by_file ON chunks (file_id);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _digest(value):
+    return hashlib.sha256(str(value).encode('utf-8')).hexdigest()[:32]
+
+
+def index_version(result):
+    """Version of a read_file result that its vector index is tied to."""
+    version = result.get('checksum') or result.get('version') or ''
+    if 'pages_read' in result:
+        # Partial PDF reads produce different text for the same file version
+        version += f"-p{result['pages_read']}"
+    return version
+
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings():
+    """Return the process-wide embeddings client.
+
+    Cache misses go through the batched, rate-limit aware embedding pipeline.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                embeddings = EmbeddingPipeline(EMBEDDING_MODEL)
+                if EMBEDDING_CACHE_ENABLED:
+                    embeddings = CachedEmbeddings(embeddings, EMBEDDING_MODEL)
+                _embeddings = embeddings
+    return _embeddings
+
+
+class VectorIndexStore:
+    """Builds, persists and caches one FAISS index per file version."""
+
+    def __init__(self, directory=VECTOR_INDEX_DIR, memory_slots=VECTOR_INDEX_MEMORY_SLOTS):
+        self.directory = directory
+        self.memory_slots = memory_slots
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    def _file_dir(self, file_id):
+        return os.path.join(self.directory, _digest(file_id))
+
+    def _path(self, file_id, version, params):
+        return os.path.join(self._file_dir(file_id), _digest(f"{version}|{params}"))
+
+    def _build_lock(self, key):
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def get_or_build(self, file_id, version, build_documents, embeddings=None, params=""):
+        """Return the FAISS index for this file version, building it if needed.
+
+        build_documents() is only called when no saved index exists. params
+        describes how the documents are chunked and embedded, so changing the
+        chunking or model builds a fresh index.
+        """
+        embeddings = embeddings or get_embeddings()
+        key = (file_id, version, params)
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+
+        # One build per key at a time; concurrent callers wait for it
+        with self._build_lock(key):
+            with self._lock:
+                if key in self._loaded:
+                    return self._loaded[key]
+
+            path = self._path(file_id, version, params)
+            store = None
+            if os.path.isdir(path):
+                try:
+                    store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+                except Exception as e:
+                    logger.warning("Rebuilding unreadable vector index %s: %s", path, e)
+            if store is None:
+                store = FAISS.from_documents(build_documents(), embeddings)
+                self._save(file_id, path, store)
+
+            with self._lock:
+                # Forget other versions of this file
+                for old_key in [k for k in self._loaded if k[0] == file_id and k != key]:
+                    del self._loaded[old_key]
+                self._loaded[key] = store
+                while len(self._loaded) > self.memory_slots:
+                    self._loaded.popitem(last=False)
+                self._build_locks.pop(key, None)
+            return store
+
+    def _save(self, file_id, path, store):
+        file_dir = self._file_dir(file_id)
+        tmp_path = None
+        try:
+            os.makedirs(file_dir, exist_ok=True)
+            # Save to a temporary directory and move it into place atomically
+            tmp_path = tempfile.mkdtemp(dir=file_dir, prefix=".tmp")
+            store.save_local(tmp_path)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+            # Remove indexes of older versions
+            for entry in os.scandir(file_dir):
+                if entry.path != path and entry.is_dir() and not entry.name.startswith(".tmp"):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError as e:
+            logger.warning("Could not save vector index for %s: %s", file_id, e)
+        finally:
+            # Left behind when another process moved its index into place first
+            if tmp_path is not None and os.path.isdir(tmp_path):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def invalidate(self, file_id):
+        """Drop every index of a file from memory and disk."""
+        with self._lock:
+            for key in [k for k in self._loaded if k[0] == file_id]:
+                del self._loaded[key]
+        shutil.rmtree(self._file_dir(file_id), ignore_errors=True)
+
+
+class CorpusVectorIndex:
+    """One persistent FAISS index over many documents, updated one document at a time.
+
+    FAISS ids are the chunk row ids in SQLite. Every change is made under an
+    inter-process file lock and bumps a generation number, so processes sharing
+    the directory reload the index when another one changed it.
+    """
+
+    def __init__(self, directory=CORPUS_INDEX_DIR, params=""):
+        self.directory = directory
+        self.params = params
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "index.faiss")
+        self._lock_path = os.path.join(directory, "index.lock")
+        self._conn = sqlite3.connect(os.path.join(directory, "corpus.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(CORPUS_SCHEMA)
+        self._lock = threading.RLock()
+        self._index = None
+        self._generation = None
+
+    def _stored_generation(self):
+        row = self._conn.execute("SELECT value FROM state WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _refresh(self):
+        """Load the saved index if it changed since this process last read it."""
+        generation = self._stored_generation()
+        if generation == self._generation:
+            return
+        self._index = faiss.read_index(self._index_path) if os.path.exists(self._index_path) else None
+        self._generation = generation
+
+    def stale(self, versions):
+        """File IDs of {file_id: version} that are missing or indexed at another version."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT file_id, version, params FROM files WHERE file_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(versions)),)
+            ).fetchall()
+        current = {file_id for file_id, version, params in rows
+                   if version == versions[file_id] and params == self.params}
+        return [file_id for file_id in versions if file_id not in current]
+
+    def update(self, documents, embeddings=None):
+        """Index documents, given as (file_id, version, [Document]) triples, replacing older versions."""
+        embeddings = embeddings or get_embeddings()
+        texts = [doc.page_content for _, _, docs in documents for doc in docs]
+        # Embedding happens outside the locks; it is the slow part
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype='float32') if texts else None
+
+        with file_lock(self._lock_path), self._lock:
+            self._refresh()
+            try:
+                with self._conn:
+                    ids = []
+                    for file_id, version, docs in documents:
+                        self._remove(file_id)
+                        for doc in docs:
+                            cursor = self._conn.execute(
+                                "INSERT INTO chunks (file_id, source, start, text) VALUES (?, ?, ?, ?)",
+                                (file_id, doc.metadata.get('source'), doc.metadata.get('start'), doc.page_content)
+                            )
+                            ids.append(cursor.lastrowid)
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO files (file_id, version, params, chunks) VALUES (?, ?, ?, ?)",
+                            (file_id, version, self.params, len(docs))
+                        )
+                    if ids:
+                        if self._index is None:
+                            self._index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+                        self._index.add_with_ids(vectors, np.asarray(ids, dtype='int64'))
+                    self._save()
+            except Exception:
+                # The in-memory index may hold changes that were rolled back
+                self._generation = None
+                raise
+
+    def remove(self, file_id):
+        """Drop a document from the index."""
+        with file_lock(self._lock_path), self._lock:
+            self._refresh()
+            try:
+                with self._conn:
+                    self._remove(file_id)
+                    self._save()
+            except Exception:
+                self._generation = None
+                raise
+
+    def _remove(self, file_id):
+        ids = [row[0] for row in self._conn.execute("SELECT id FROM chunks WHERE file_id = ?", (file_id,))]
+        if ids and self._index is not None:
+            self._index.remove_ids(np.asarray(ids, dtype='int64'))
+        self._conn.execute("DELETE FROM chunks WHERE file_id = ?", (file_id,))
+        self._conn.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+
+    def _save(self):
+        """Write the index atomically and publish a new generation (inside the SQLite transaction)."""
+        if self._index is not None:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            os.close(fd)
+            faiss.write_index(self._index, tmp_path)
+            os.replace(tmp_path, self._index_path)
+        generation = self._stored_generation() + 1
+        self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('generation', ?)", (str(generation),))
+        self._generation = generation
+
+    def search(self, query_vector, file_ids, k):
+        """Top-k (Document, distance) pairs among the chunks of file_ids."""
+        with self._lock:
+            self._refresh()
+            if self._index is None:
+                return []
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM chunks WHERE file_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(file_ids)),)
+            )]
+            if not ids:
+                return []
+            selector = faiss.IDSelectorBatch(np.asarray(ids, dtype='int64'))
+            distances, labels = self._index.search(
+                np.asarray([query_vector], dtype='float32'), min(k, len(ids)),
+                params=faiss.SearchParameters(sel=selector)
+            )
+            hits = [(int(label), float(distance)) for label, distance in zip(labels[0], distances[0]) if label >= 0]
+            rows = {row[0]: row for row in self._conn.execute(
+                "SELECT id, file_id, source, start, text FROM chunks WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps([label for label, _ in hits]),)
+            )}
+        # FAISS returns L2 distances, closest first
+        return [
+            (Document(page_content=rows[label][4],
+                      metadata={'file_id': rows[label][1], 'source': rows[label][2], 'start': rows[label][3]}),
+             distance)
+            for label, distance in hits if label in rows
+        ]
+
+
+# Shared by every tool in the process
+vector_index_store = VectorIndexStore()
+
+_corpus_indexes = {}
+_corpus_lock = threading.Lock()
+
+
+def get_corpus_index(params):
+    """Return the process-wide corpus index for documents chunked and embedded as params describes."""
+    with _corpus_lock:
+        if params not in _corpus_indexes:
+            # Each chunking and embedding setup gets its own directory, since vector sizes may differ
+            directory = os.path.join(CORPUS_INDEX_DIR, _digest(params))
+            _corpus_indexes[params] = CorpusVectorIndex(directory, params=params)
+        return _corpus_indexes[params]
@@ -0,0 +1,91 @@
+"""
+Google Drive AI Agent: Section Parser Benchmark
+Compares the single-pass section parser with the previous regex implementation.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_section_parser --sizes 0.1 0.5 1 5 50
+
+The previous implementation is quadratic, so it is only run up to --legacy-max-mb.
+"""
+
+import re
+import time
+import argparse
+
+from app.tools.section_parser import parse_sections
+
+BLOCK = """# Overview of the quarter
+Revenue grew in every region. The board reviewed the results on 12 March.
+
+1.2. Regional results
+North America led growth, followed by Europe and Asia Pacific.
+
+RISKS AND MITIGATIONS
+Supply constraints eased during the second half.
+
+Action items:
+Finalize the budget and circulate the revised forecast.
+
+"""
+
+
+def legacy_parse_sections(content):
+    """The section parser DocumentParser used before the single-pass parser."""
+    section_patterns = [
+        r'(?:^|\n)#{1,6}\s+(.+?)(?=\n#{1,6}\s+|\Z)',
+        r'(?:^|\n)(?:\d+\.)+\s+(.+?)(?=\n(?:\d+\.)+\s+|\Z)',
+        r'(?:^|\n)([A-Z][A-Z\s]+[A-Z])(?:\n|\Z)',
+        r'(?:^|\n)([^:\n]+):(?:\n|\Z)'
+    ]
+    sections = []
+    remaining_content = content
+    for pattern in section_patterns:
+        for match in re.finditer(pattern, content, re.MULTILINE | re.DOTALL):
+            sections.append({'title': match.group(1).strip(), 'content': match.group(0).strip()})
+            remaining_content = remaining_content.replace(match.group(0), '', 1)
+    if not sections or remaining_content.strip():
+        parts = [p for p in remaining_content.split('\n\n') if p.strip()]
+        if len(parts) > 1:
+            for i, part in enumerate(parts):
+                sections.append({'title': f"Section {i+1}", 'content': part.strip()})
+        else:
+            sections.append({'title': "Document Content", 'content': remaining_content.strip()})
+    return sections
+
+
+def make_document(megabytes):
+    repeats = max(1, int(megabytes * 1024 * 1024 / len(BLOCK)))
+    return BLOCK * repeats
+
+
+def timed(func, content):
+    start = time.perf_counter()
+    result = func(content)
+    return time.perf_counter() - start, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=float, nargs='+', default=[0.1, 0.5, 1, 5, 50],
+                        help="Document sizes to parse, in MB")
+    parser.add_argument('--legacy-max-mb', type=float, default=5,
+                        help="Largest size the previous implementation is run on")
+    args = parser.parse_args()
+
+    print(f"{'size (MB)':>10} {'sections':>10} {'single-pass (s)':>16} {'MB/s':>8} {'previous (s)':>13} {'speedup':>8}")
+    for size in args.sizes:
+        content = make_document(size)
+        megabytes = len(content) / (1024 * 1024)
+        seconds, count = timed(parse_sections, content)
+        line = f"{megabytes:>10.2f} {count:>10} {seconds:>16.3f} {megabytes / seconds:>8.1f}"
+        if size <= args.legacy_max_mb:
+            legacy_seconds, _ = timed(legacy_parse_sections, content)
+            line += f" {legacy_seconds:>13.3f} {legacy_seconds / seconds:>7.0f}x"
+        else:
+            line += f" {'skipped':>13} {'':>8}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,20 @@
 from mcp.server.fastmcp import FastMCP
-from agent import create_drive_agent
+from agent import DriveAgentPool
 from typing import Dict, Any
 
 # Create MCP server
 mcp = FastMCP("GoogleDriveAgent")
 
+# Agents are built once at startup and reused across requests
+agent_pool = None
+
+
+def get_agent_pool() -> DriveAgentPool:
+    global agent_pool
+    if agent_pool is None:
+        agent_pool = DriveAgentPool()
+    return agent_pool
+
 @mcp.tool()
 async def interact_with_drive(query: str) -> str:
     """
@@ -17,11 +27,9 @@ async def interact_with_drive(query: str) -> str:
         str: The agent's response to the query
     """
     try:
-        # Create the agent
-        agent = create_drive_agent()
-        
-        # Invoke the agent with the query
-        response = agent.invoke({"input": query})
+        # Invoke a pooled agent without blocking the event loop;
+        # the synchronous tools run in worker threads
+        response = await get_agent_pool().ainvoke(query)
         
         return response['output']
     except Exception as e:
@@ -56,6 +64,10 @@ async def get_available_tools() -> Dict[str, Any]:
             "name": "read_file",
             "description": "Reads the content of text-based files"
         },
+        {
+            "name": "read_files",
+            "description": "Reads the content of several files at once"
+        },
         {
             "name": "parse_document",
             "description": "Parses a document into sections, paragraphs, or sentences"
@@ -66,16 +78,24 @@ async def get_available_tools() -> Dict[str, Any]:
         },
         {
             "name": "summarize_document",
-            "description": "Creates a concise summary of a document"
+            "description": "Creates a concise summary of a document or of one of its sections"
         },
         {
             "name": "search_in_document",
             "description": "Searches for keywords or phrases within a document"
         },
+        {
+            "name": "search_document_contents",
+            "description": "Searches the text of all indexed documents and ranks matching files"
+        },
         {
             "name": "answer_question",
             "description": "Answers specific questions about file contents"
         },
+        {
+            "name": "answer_corpus_question",
+            "description": "Answers questions across all documents in a folder or matching a search, with sources"
+        },
         {
             "name": "upload_file_to_drive",
             "description": "Uploads a local file to Google Drive. Optionally specify a folder to upload into."
@@ -88,5 +108,8 @@ async def get_available_tools() -> Dict[str, Any]:
     }
 
 if __name__ == "__main__":
+    # Build the agent pool before accepting requests
+    get_agent_pool()
+
     # Run the MCP server
     mcp.run(transport="stdio") 
\ No newline at end of file
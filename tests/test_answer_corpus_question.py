@@ -0,0 +1,59 @@
+import pytest
+
+file_content_tools = pytest.importorskip("app.tools.file_content_tools")
+
+
+class FakeCorpus:
+    def stale(self, versions):
+        return []
+
+    def update(self, documents):
+        pass
+
+    def search(self, query_vector, file_ids, k):
+        self.searched = set(file_ids)
+        return []
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [0.0]
+
+
+@pytest.fixture
+def listing(monkeypatch):
+    corpus = FakeCorpus()
+    listed = []
+
+    def iter_files(service, q, fields):
+        for i in range(10000):
+            listed.append(i)
+            yield {'id': f"file-{i}", 'mimeType': 'text/plain', 'md5Checksum': str(i), 'version': '1'}, None
+
+    monkeypatch.setattr(file_content_tools, "get_drive_service", lambda: None)
+    monkeypatch.setattr(file_content_tools, "iter_files", iter_files)
+    monkeypatch.setattr(file_content_tools, "get_corpus_index", lambda params: corpus)
+    monkeypatch.setattr(file_content_tools, "get_embeddings", lambda: FakeEmbeddings())
+    return corpus, listed
+
+
+def test_max_files_defaults_to_the_schema_default(listing):
+    corpus, listed = listing
+    tool = file_content_tools.AnswerCorpusQuestionTool()
+
+    output = tool.run({'question': "What changed?", 'folder_id': "folder"})
+
+    assert output == "No relevant passages found in folder folder."
+    assert len(corpus.searched) == file_content_tools.CORPUS_DEFAULT_FILES
+    schema_default = file_content_tools.AnswerCorpusQuestionInput.model_fields['max_files'].default
+    assert schema_default == file_content_tools.CORPUS_DEFAULT_FILES
+
+
+def test_max_files_is_capped(listing, monkeypatch):
+    corpus, _ = listing
+    monkeypatch.setattr(file_content_tools, "CORPUS_MAX_FILES", 20)
+    tool = file_content_tools.AnswerCorpusQuestionTool()
+
+    tool.run({'question': "What changed?", 'query': "report", 'max_files': 100})
+
+    assert len(corpus.searched) == 20
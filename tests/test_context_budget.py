@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from app.tools.context_budget import ContextBudget
+
+
+def tool_turn(number, output_chars):
+    call_id = f"call-{number}"
+    return [
+        HumanMessage(content=f"Question {number}"),
+        AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"file_id": str(number)}, "id": call_id}]),
+        ToolMessage(content="x" * output_chars, tool_call_id=call_id, name="read_file"),
+        AIMessage(content=f"Answer {number}"),
+    ]
+
+
+def conversation(turns, output_chars):
+    messages = [SystemMessage(content="You are DriveAssistant.")]
+    for number in range(turns):
+        messages += tool_turn(number, output_chars)
+    return messages
+
+
+def total(budget, messages):
+    return sum(budget.count_message(message) for message in messages)
+
+
+def test_history_is_trimmed_to_the_budget():
+    budget = ContextBudget(max_tokens=2000, recent_turns=2, preview_chars=200)
+    messages = conversation(turns=30, output_chars=4000)
+    assert total(budget, messages) > 10 * budget.max_tokens
+
+    fitted = budget.fit(messages)
+
+    assert total(budget, fitted) <= budget.max_tokens
+    assert isinstance(fitted[0], SystemMessage)
+    assert fitted[-4].content == "Question 29"
+    # Oldest turns are dropped whole, so the history still starts at a question
+    assert fitted[1].type == "human"
+
+
+def test_older_tool_outputs_are_collapsed_and_recent_ones_kept():
+    budget = ContextBudget(max_tokens=100000, recent_turns=2, preview_chars=200)
+    fitted = budget.fit(conversation(turns=4, output_chars=4000))
+
+    outputs = [message.content for message in fitted if isinstance(message, ToolMessage)]
+    assert [len(output) == 4000 for output in outputs] == [False, False, True, True]
+    assert outputs[0].startswith("[Earlier read_file output, 4000 characters, shortened")
+    # Tool call ids still pair each call with its output
+    assert [m.tool_call_id for m in fitted if isinstance(m, ToolMessage)] == [f"call-{i}" for i in range(4)]
+
+
+def test_current_turn_alone_over_budget_is_truncated():
+    budget = ContextBudget(max_tokens=1000, recent_turns=2, preview_chars=200)
+    messages = [SystemMessage(content="You are DriveAssistant.")] + tool_turn(0, 40000)[:3]
+
+    fitted = budget.fit(messages)
+
+    assert total(budget, fitted) <= budget.max_tokens
+    assert [message.type for message in fitted] == ["system", "human", "ai", "tool"]
+    assert "[Output truncated from 40000 characters" in fitted[-1].content
@@ -0,0 +1,79 @@
+import multiprocessing
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from app.tools.embedding_cache import EmbeddingCache
+
+DIM = 64
+MAX_ENTRIES = 200
+WRITERS = 3
+BATCHES = 100
+BATCH_SIZE = 20
+
+
+def key(writer, number):
+    return f"w{writer}-{number}"
+
+
+def vector(name):
+    writer, number = name[1:].split("-")
+    return [float(int(writer) * 100000 + int(number))] * DIM
+
+
+def write(directory, writer):
+    cache = EmbeddingCache("model", directory=directory, max_entries=MAX_ENTRIES)
+    for batch in range(BATCHES):
+        names = [key(writer, batch * BATCH_SIZE + i) for i in range(BATCH_SIZE)]
+        cache.put_many([(name, vector(name)) for name in names])
+
+
+def read(directory, done, results):
+    cache = EmbeddingCache("model", directory=directory, max_entries=MAX_ENTRIES)
+    names = [key(writer, number) for writer in range(WRITERS) for number in range(BATCHES * BATCH_SIZE)]
+    wrong = found = 0
+    while not done.is_set():
+        for name, values in cache.get_many(names).items():
+            found += 1
+            wrong += values != vector(name)
+    results.put((found, wrong))
+
+
+def test_concurrent_processes_never_read_another_chunks_vector(tmp_path):
+    directory = str(tmp_path)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    done = context.Event()
+    writers = [context.Process(target=write, args=(directory, writer)) for writer in range(WRITERS)]
+    readers = [context.Process(target=read, args=(directory, done, results)) for _ in range(2)]
+    for process in writers + readers:
+        process.start()
+    for process in writers:
+        process.join(timeout=120)
+    done.set()
+    reads = [results.get(timeout=120) for _ in readers]
+    for process in writers + readers:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    assert sum(found for found, _ in reads) > 0
+    assert sum(wrong for _, wrong in reads) == 0
+
+    cache = EmbeddingCache("model", directory=directory, max_entries=MAX_ENTRIES)
+    assert cache.stats()["entries"] == MAX_ENTRIES
+    names = [key(writer, number) for writer in range(WRITERS) for number in range(BATCHES * BATCH_SIZE)]
+    stored = cache.get_many(names)
+    assert len(stored) == MAX_ENTRIES
+    assert all(values == vector(name) for name, values in stored.items())
+
+
+def test_rows_are_reused_least_recently_used_first(tmp_path):
+    cache = EmbeddingCache("model", directory=str(tmp_path), max_entries=3)
+    for i in range(3):
+        cache.put_many([(key(0, i), vector(key(0, i)))])
+    cache.get_many([key(0, 0)])
+    cache.put_many([(key(0, 3), vector(key(0, 3)))])
+
+    assert set(cache.get_many([key(0, i) for i in range(4)])) == {key(0, 0), key(0, 2), key(0, 3)}
@@ -0,0 +1,126 @@
+import json
+import threading
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("langchain_core")
+
+from app.tools import embedding_pipeline
+from app.tools.embedding_pipeline import AdaptiveLimiter, EmbeddingPipeline, RateLimitedError
+
+
+def embedding_response(request):
+    texts = json.loads(request.content)["input"]
+    data = [{"index": i, "embedding": [float(len(text)), 1.0]} for i, text in enumerate(texts)]
+    return httpx.Response(200, json={"data": data})
+
+
+class FakeEndpoint:
+    """An embeddings endpoint that answers with a scripted status per request."""
+
+    def __init__(self, statuses=(), headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers or {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        with self._lock:
+            self.requests += 1
+            status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            return httpx.Response(status, headers=self.headers)
+        return embedding_response(request)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(embedding_pipeline.time, "sleep", delays.append)
+    return delays
+
+
+def make_pipeline(endpoint, **kwargs):
+    kwargs.setdefault("max_concurrency", 8)
+    return EmbeddingPipeline("test-model", base_url="http://embeddings.test/v1", api_key="key",
+                             transport=httpx.MockTransport(endpoint), **kwargs)
+
+
+def test_limiter_halves_on_rate_limit_and_grows_back():
+    limiter = AdaptiveLimiter(8)
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.on_success()
+    assert limiter.limit == 3
+    for _ in range(3 + 4 + 5 + 6 + 7):
+        limiter.on_success()
+    assert limiter.limit == 8
+    limiter.on_success()
+    assert limiter.limit == 8
+
+
+def test_limiter_never_drops_below_minimum():
+    limiter = AdaptiveLimiter(2)
+    for _ in range(5):
+        limiter.on_rate_limited()
+    assert limiter.limit == 1
+
+
+def test_rate_limits_lower_concurrency_and_successes_restore_it(sleeps):
+    endpoint = FakeEndpoint(statuses=[429, 429], headers={"retry-after": "0"})
+    pipeline = make_pipeline(endpoint, max_batch_size=1)
+
+    assert pipeline.embed_query("hello") == [5.0, 1.0]
+    assert pipeline.limiter.limit == 2
+    assert pipeline.stats()["rate_limited"] == 2
+    assert sleeps == [0.0, 0.0]
+
+    vectors = pipeline.embed_documents([f"text {i}" for i in range(40)])
+    assert len(vectors) == 40
+    assert pipeline.limiter.limit == 8
+
+
+def test_transient_errors_are_retried_with_exponential_backoff(sleeps):
+    endpoint = FakeEndpoint(statuses=[503, 500, 502])
+    pipeline = make_pipeline(endpoint)
+
+    assert pipeline.embed_documents(["a", "bb"]) == [[1.0, 1.0], [2.0, 1.0]]
+    assert endpoint.requests == 4
+    assert sleeps == [0.5, 1.0, 2.0]
+    assert pipeline.stats()["retries"] == 3
+    # Server errors are not rate limits
+    assert pipeline.limiter.limit == 8
+
+
+def test_batch_fails_after_exhausting_retries(sleeps):
+    endpoint = FakeEndpoint(statuses=[429] * 10)
+    pipeline = make_pipeline(endpoint, max_retries=3)
+
+    with pytest.raises(RateLimitedError, match="HTTP 429"):
+        pipeline.embed_query("hello")
+    assert endpoint.requests == 4
+    # No wait after the last attempt
+    assert sleeps == [0.5, 1.0, 2.0]
+
+
+def test_client_errors_are_not_retried(sleeps):
+    endpoint = FakeEndpoint(statuses=[400])
+    pipeline = make_pipeline(endpoint)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        pipeline.embed_query("hello")
+    assert endpoint.requests == 1
+    assert sleeps == []
+
+
+def test_each_batch_is_retried_on_its_own(sleeps):
+    endpoint = FakeEndpoint(statuses=[429], headers={"retry-after": "0"})
+    pipeline = make_pipeline(endpoint, max_batch_size=2, max_concurrency=1)
+
+    vectors = pipeline.embed_documents(["a", "bb", "ccc", "dddd"])
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0], [4.0, 1.0]]
+    # Two batches, the first of which needed one retry
+    assert endpoint.requests == 3
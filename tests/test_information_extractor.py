@@ -0,0 +1,52 @@
+from app.tools.information_extractor import extract, parse_info_types
+
+
+def values(text, info_types=None):
+    result = extract(text) if info_types is None else extract(text, info_types)
+    return {info_type: [entry.value for entry in entries] for info_type, entries in result.items()}
+
+
+def test_date_after_a_name_is_found():
+    found = values("Board Meeting March 12, 2024 in Paris.")
+    assert found['dates'] == ['March 12, 2024']
+    assert found['names'] == ['Board Meeting']
+
+
+def test_weekday_before_a_date_is_not_a_name():
+    found = values("Tuesday March 5, 2024")
+    assert found['dates'] == ['March 5, 2024']
+    assert found['names'] == []
+
+
+def test_month_names_can_still_be_person_names():
+    found = values("May Jones met June Carter on May 3.")
+    assert found['names'] == ['May Jones', 'June Carter']
+    assert found['dates'] == ['May 3']
+
+
+def test_names_and_dates_inside_a_header_line():
+    found = values("# Review with John Smith on 2024-04-02\nBody text")
+    assert found['headers'] == ['Review with John Smith on 2024-04-02']
+    assert found['names'] == ['John Smith']
+    assert found['dates'] == ['2024-04-02']
+
+
+def test_each_type_is_found_when_requested_alone():
+    text = "Please ask Mary Jones (mary@example.com) before March 12, 2024, see https://example.com/a"
+    assert values(text, ('names',)) == {'names': ['Mary Jones']}
+    assert values(text, ('dates',)) == {'dates': ['March 12, 2024']}
+    assert values(text, ('emails',)) == {'emails': ['mary@example.com']}
+    assert values(text, ('urls',)) == {'urls': ['https://example.com/a']}
+
+
+def test_repeated_values_are_counted_once_with_their_positions():
+    text = "John Smith wrote to John Smith. New York is not a name."
+    (entry,) = extract(text, ('names',))['names']
+    assert entry.value == 'John Smith'
+    assert entry.count == 2
+    assert entry.positions == (0, 20)
+
+
+def test_parse_info_types():
+    assert parse_info_types('all') == ('dates', 'names', 'emails', 'urls', 'headers')
+    assert parse_info_types('Emails, dates') == ('dates', 'emails')
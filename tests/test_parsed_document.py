@@ -0,0 +1,38 @@
+from app.tools.parsed_document import ParsedDocument, pack_spans
+
+
+def assert_no_contained_chunks(chunks):
+    for (_, previous_end), (start, end) in zip(chunks, chunks[1:]):
+        assert end > previous_end
+        assert start <= end
+
+
+def test_overlap_is_shed_when_the_next_unit_does_not_fit_after_it():
+    chunks = pack_spans([(0, 5), (6, 10), (11, 20), (21, 30)], 12, 5)
+    assert chunks == [(0, 10), (11, 20), (21, 30)]
+
+
+def test_paragraph_chunks_never_repeat_the_previous_tail():
+    paragraphs = ["a" * n for n in (500, 150, 900, 100, 950)]
+    document = ParsedDocument("\n\n".join(paragraphs))
+    chunks = document.chunk_spans(1000, 200)
+    assert chunks == [(0, 652), (654, 1554), (1556, 1656), (1658, 2608)]
+    assert_no_contained_chunks(chunks)
+
+
+def test_chunks_overlap_by_whole_units_within_the_budget():
+    units = [(i * 10, i * 10 + 8) for i in range(30)]
+    chunks = pack_spans(units, 50, 20)
+    assert chunks[:3] == [(0, 48), (30, 78), (60, 108)]
+    assert chunks[-1][1] == units[-1][1]
+    assert all(end - start <= 50 for start, end in chunks)
+    assert_no_contained_chunks(chunks)
+
+
+def test_unit_longer_than_size_is_its_own_chunk():
+    assert pack_spans([(0, 3), (4, 30), (31, 33)], 10, 4) == [(0, 3), (4, 30), (31, 33)]
+
+
+def test_without_overlap_chunks_are_disjoint():
+    chunks = pack_spans([(0, 4), (5, 9), (10, 14), (15, 19)], 10, 0)
+    assert chunks == [(0, 9), (10, 19)]
@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+file_content_tools = pytest.importorskip("app.tools.file_content_tools")
+
+
+def test_pool_threads_keep_their_drive_service_across_calls(monkeypatch):
+    local = threading.local()
+    built = []
+
+    def get_drive_service():
+        if not hasattr(local, "service"):
+            local.service = object()
+            built.append(threading.current_thread().name)
+        return local.service
+
+    def read_file(self, file_id, max_pages=5, file_metadata=None):
+        return {'content': file_id, 'file_name': file_metadata['name'], 'mime_type': 'text/plain',
+                'status': 'success'}
+
+    monkeypatch.setattr(file_content_tools, "get_drive_service", get_drive_service)
+    monkeypatch.setattr(file_content_tools.FileReader, "get_files_metadata",
+                        lambda self, file_ids: {file_id: {'name': file_id} for file_id in file_ids})
+    monkeypatch.setattr(file_content_tools.FileReader, "read_file", read_file)
+    reader = file_content_tools.FileReader(service=None)
+
+    for _ in range(5):
+        batch = reader.read_files([f"file-{i}" for i in range(20)])
+        assert batch['succeeded'] == 20
+        assert [result['content'] for result in batch['results']] == [f"file-{i}" for i in range(20)]
+
+    assert all(name.startswith("read-files") for name in built)
+    assert len(built) <= file_content_tools.READ_FILES_MAX_WORKERS
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.service.scheduler import SchedulerBusy, ThreadScheduler
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_messages_beyond_the_queue_limit_get_a_busy_reply():
+    async def scenario():
+        # Six webhook workers, two agent runs: at most four messages can wait
+        workers, max_concurrency = 6, 2
+        scheduler = ThreadScheduler(max_concurrency, (workers - max_concurrency) // 2)
+        release = asyncio.Event()
+
+        async def handle(thread_id):
+            try:
+                return await scheduler.run(thread_id, release.wait)
+            except SchedulerBusy:
+                return "busy"
+
+        tasks = []
+        for i in range(workers):
+            tasks.append(asyncio.create_task(handle(f"thread-{i}")))
+            await settle()
+        assert scheduler.stats()["in_flight"] == 2
+        assert scheduler.stats()["queued"] == 2
+        release.set()
+        results = await asyncio.gather(*tasks)
+        assert results.count("busy") == 2
+        assert scheduler.stats()["rejected"] == 2
+        assert scheduler.stats()["queued"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_no_busy_reply_while_a_slot_is_free():
+    async def scenario():
+        scheduler = ThreadScheduler(2, 0)
+        release = asyncio.Event()
+        first = asyncio.create_task(scheduler.run("a", release.wait))
+        await settle()
+        second = asyncio.create_task(scheduler.run("b", release.wait))
+        await settle()
+        with pytest.raises(SchedulerBusy):
+            await scheduler.run("c", release.wait)
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+
+
+def test_messages_of_one_thread_run_in_order():
+    async def scenario():
+        scheduler = ThreadScheduler(4, 10)
+        order = []
+
+        def job(number, delay):
+            async def run():
+                await asyncio.sleep(delay)
+                order.append(number)
+            return run
+
+        await asyncio.gather(*(scheduler.run("same", job(i, 0.01 * (3 - i))) for i in range(3)))
+        assert order == [0, 1, 2]
+        assert scheduler.stats()["active_threads"] == 0
+
+    asyncio.run(scenario())
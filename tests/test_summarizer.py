@@ -0,0 +1,53 @@
+import pytest
+
+summarizer = pytest.importorskip("app.tools.summarizer")
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeModel:
+    """A chat model that records its prompts and answers with a short summary."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def bind(self, **kwargs):
+        return self
+
+    def batch(self, prompts, config=None):
+        self.prompts.extend(prompts)
+        return [Response(f"summary {len(self.prompts)}") for _ in prompts]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    model = FakeModel()
+    store = summarizer.SummaryStore(str(tmp_path / "summaries.sqlite3"))
+    engine = summarizer.SummarizationEngine(llm=model, store=store, model="test-model")
+    # Count tokens from the text length, as when tiktoken is unavailable
+    engine.count_tokens = lambda text: len(text) // 4 + 1
+    return engine, model
+
+
+def test_short_document_is_summarized_as_one_text(engine):
+    engine, model = engine
+    text = "The board approved the 2024 budget on March 12."
+
+    assert engine.summarize_text(text, 150) == "summary 1"
+    (prompt,) = model.prompts
+    assert prompt == summarizer.TEXT_PROMPT.format(words=112, text=text)
+    assert "summaries of consecutive parts" not in prompt
+
+
+def test_long_document_is_mapped_then_reduced(engine):
+    engine, model = engine
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 300 for i in range(6))
+
+    engine.summarize_text(text, 150)
+
+    assert model.prompts[-1].startswith("The following are summaries of consecutive parts")
+    assert all(prompt.startswith("Write a concise summary") for prompt in model.prompts[:-1])
+    assert len(model.prompts) > 2
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+vector_store = pytest.importorskip("app.tools.vector_store")
+
+
+class FakeStore:
+    def save_local(self, path):
+        with open(os.path.join(path, "index.faiss"), "w") as f:
+            f.write("index")
+
+
+def entries(directory):
+    return sorted(name for _, names, _ in os.walk(directory) for name in names)
+
+
+def test_save_moves_the_index_into_place(tmp_path):
+    store = vector_store.VectorIndexStore(directory=str(tmp_path))
+    path = store._path("file", "v1", "")
+    store._save("file", path, FakeStore())
+
+    assert os.path.isfile(os.path.join(path, "index.faiss"))
+    assert not [name for name in entries(tmp_path) if name.startswith(".tmp")]
+
+
+def test_failed_save_removes_its_temporary_directory(tmp_path, monkeypatch):
+    store = vector_store.VectorIndexStore(directory=str(tmp_path))
+    path = store._path("file", "v1", "")
+
+    def replace(source, destination):
+        raise OSError("Directory not empty")
+
+    monkeypatch.setattr(vector_store.os, "replace", replace)
+    store._save("file", path, FakeStore())
+
+    assert not [name for name in entries(tmp_path) if name.startswith(".tmp")]
+    assert not os.path.exists(path)